@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import glob
+import sys
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from event_analyser import EventAnalyser, EVENT_SIZE_BUCKET_EDGES
+from hdf5reader import HDF5Reader
+from summary_stats import Moments, Histogram, QuantileSketch
+from dataset_catalog import DatasetCatalog
+
+TIME_DELAYS = (0.1, 0.2, 0.5, 1.0)
+# Post event relative price change is usually within a few units of zero
+HISTOGRAM_EDGES = np.linspace(-5, 5, 101)
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+class PostEventSummary():
+    # Distribution of the post event relative price change (as in
+    # EventAnalyser.get_relative_price_change_distribution) per event size bucket and delay,
+    # kept as moments, a fixed-edge histogram and a quantile sketch. Summaries of different
+    # partitions merge into the distribution over all of them.
+
+    def __init__(self, histogram_edges=HISTOGRAM_EDGES, relative_accuracy=0.01):
+        self.histogram_edges = np.asarray(histogram_edges, dtype=float)
+        self.relative_accuracy = relative_accuracy
+        # (event size bucket, time delay) -> (Moments, Histogram, QuantileSketch)
+        self.stats = {}
+        self.partitions = 0
+        self.events = 0
+
+    def __stats(self, bucket, time_delay):
+        key = (int(bucket), float(time_delay))
+        if key not in self.stats:
+            self.stats[key] = (Moments(), Histogram(self.histogram_edges), QuantileSketch(self.relative_accuracy))
+        return self.stats[key]
+
+    def update(self, bucket, time_delay, values):
+        for summary in self.__stats(bucket, time_delay):
+            summary.update(values)
+        return self
+
+    def merge(self, other):
+        for (bucket, time_delay), summaries in other.stats.items():
+            for summary, other_summary in zip(self.__stats(bucket, time_delay), summaries):
+                summary.merge(other_summary)
+        self.partitions += other.partitions
+        self.events += other.events
+        return self
+
+    def histogram(self, bucket, time_delay) -> Histogram:
+        return self.__stats(bucket, time_delay)[1]
+
+    def to_frame(self, quantiles=QUANTILES) -> pd.DataFrame:
+        rows = []
+        for (bucket, time_delay), (moments, histogram, sketch) in sorted(self.stats.items()):
+            rows.append({
+                "Event size bucket": bucket,
+                "Time delay": time_delay,
+                "Count": moments.count,
+                "Mean": moments.mean if moments.count else np.nan,
+                "Std": moments.std(),
+                "Min": moments.min if moments.count else np.nan,
+                "Max": moments.max if moments.count else np.nan,
+                **{f"Q{q * 100:g}": value for q, value in zip(quantiles, sketch.quantiles(quantiles))},
+                "Below histogram": histogram.underflow,
+                "Above histogram": histogram.overflow,
+            })
+        return pd.DataFrame(rows)
+
+
+class BatchAnalyser():
+    # Runs EventAnalyser over many order book partitions (e.g. instrument-days from a
+    # DatasetCatalog) on a process pool. Each worker reads one partition and returns only its
+    # PostEventSummary, which is merged as it completes; no events are kept in the parent.
+
+    def __init__(self, time_delays=TIME_DELAYS, bucket_size=0.1, bucket_edges=EVENT_SIZE_BUCKET_EDGES,
+                 histogram_edges=HISTOGRAM_EDGES, relative_accuracy=0.01):
+        self.time_delays = list(time_delays)
+        self.bucket_size = bucket_size
+        self.bucket_edges = list(bucket_edges)
+        self.histogram_edges = np.asarray(histogram_edges, dtype=float)
+        self.relative_accuracy = relative_accuracy
+
+    def run(self, paths: list, max_workers: int = None) -> PostEventSummary:
+        summary = self.empty_summary()
+        jobs = [(path, self.time_delays, self.bucket_size, self.bucket_edges, self.histogram_edges,
+                 self.relative_accuracy) for path in paths]
+        if max_workers == 1:
+            for job in jobs:
+                summary.merge(summarise_partition(job))
+            return summary
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(summarise_partition, job) for job in jobs]
+            for future in as_completed(futures):
+                summary.merge(future.result())
+        return summary
+
+    def empty_summary(self) -> PostEventSummary:
+        return PostEventSummary(self.histogram_edges, self.relative_accuracy)
+
+
+def summarise_partition(job) -> PostEventSummary:
+    path, time_delays, bucket_size, bucket_edges, histogram_edges, relative_accuracy = job
+    summary = PostEventSummary(histogram_edges, relative_accuracy)
+    order_book = HDF5Reader.read_window(path, columns=["Transaction time", "Bid price", "Ask price"])
+    summary.partitions = 1
+    if len(order_book) == 0:
+        return summary
+    analyser = EventAnalyser(order_book, None, bucket_edges)
+    events = analyser.analyse(save=False, bucket_size=bucket_size)
+    summary.events = len(events)
+    # P2 for every event and delay in one lookup, then (P2 - P1) / (P1 * relative price change)
+    end_prices = events["Event end price"].to_numpy()
+    post_event_prices = analyser.get_post_event_prices(events["Event end time"].to_numpy(), time_delays)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = ((post_event_prices - end_prices[:, np.newaxis])
+                   / (end_prices * events["Relative price change"].to_numpy())[:, np.newaxis])
+    buckets = events["Event size bucket"].to_numpy()
+    for bucket in np.unique(buckets):
+        in_bucket = buckets == bucket
+        for i, time_delay in enumerate(time_delays):
+            summary.update(bucket, time_delay, changes[in_bucket, i])
+    return summary
+
+
+def partition_paths(inputs: list, catalog=None, instruments: list = None, start_time=None, end_time=None) -> list:
+    # Order book .h5 files from paths, directories and globs, or from a catalog query
+    if catalog is not None:
+        catalog = DatasetCatalog.load(catalog)
+        instruments = instruments or sorted({p["instrument"] for p in catalog.partitions})
+        return [p["path"] for instrument in instruments
+                for p in catalog.query(instrument, start_time, end_time, 'order_book')]
+    paths = []
+    for name in inputs:
+        if os.path.isdir(name):
+            paths.extend(sorted(glob.glob(os.path.join(name, '**', '*order_book*.h5'), recursive=True)))
+        elif glob.has_magic(name):
+            paths.extend(sorted(glob.glob(name, recursive=True)))
+        else:
+            paths.append(name)
+    return paths
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Post event price change distributions over many order book partitions")
+    parser.add_argument('inputs', nargs='*', help="order book .h5 files, directories or glob patterns")
+    parser.add_argument('--catalog', help="DatasetCatalog index to take the partitions from instead")
+    parser.add_argument('--instruments', nargs='+', help="instruments to include from the catalog (default: all)")
+    parser.add_argument('--start', type=float, help="window start in seconds since the epoch (with --catalog)")
+    parser.add_argument('--end', type=float, help="window end in seconds since the epoch (with --catalog)")
+    parser.add_argument('-d', '--delays', type=float, nargs='+', default=list(TIME_DELAYS))
+    parser.add_argument('-b', '--bucket-size', type=float, default=0.1)
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-o', '--output', default='output/post_event_summary.csv')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    paths = partition_paths(args.inputs, args.catalog, args.instruments, args.start, args.end)
+    if not paths:
+        print("No order book partitions found", file=sys.stderr)
+        return 1
+    summary = BatchAnalyser(args.delays, args.bucket_size).run(paths, args.jobs)
+    table = summary.to_frame()
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    table.to_csv(args.output, index=False)
+    print(f"{summary.partitions} partitions, {summary.events} events -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from feed_converter import OrderBookFeedConverter, PublicTradeFeedConverter
+from feed_generator import FeedGenerator, VOLATILITY_REGIMES
+from hdf5reader import HDF5Reader
+from event_analyser import EventAnalyser, DoubleEmaAnalyser
+
+STAGES = ("convert", "hdf5_roundtrip", "bin_data", "as_of_lookup", "ema_crossover", "event_extraction")
+
+class Benchmark():
+    # Times each pipeline stage on a synthetic feed from FeedGenerator and records throughput
+    # (order book records per second, best of `repeat` runs) and peak traced allocation.
+    # Results are compared against a JSON baseline to flag regressions.
+
+    def __init__(self, n_records=100_000, volatility="normal", seed=0, repeat=3, work_dir="output/benchmark"):
+        self.n_records = int(n_records)
+        self.volatility = volatility
+        self.seed = seed
+        self.repeat = repeat
+        self.work_dir = work_dir
+        os.makedirs(work_dir, exist_ok=True)
+        self.book_bytes, self.trade_bytes = FeedGenerator(self.n_records, volatility, seed).to_bytes()
+        self.order_book = OrderBookFeedConverter(self.book_bytes)._unpack_to_dataframe()
+        self.public_trade = PublicTradeFeedConverter(self.trade_bytes)._unpack_to_dataframe()
+
+    def config(self) -> dict:
+        return {"n_records": self.n_records, "volatility": self.volatility, "seed": self.seed}
+
+    def run(self, stages=STAGES) -> dict:
+        results = {}
+        for stage in stages:
+            stage_fn = getattr(self, f"_stage_{stage}")()
+            seconds, peak_bytes = self.measure(stage_fn, self.repeat)
+            results[stage] = {
+                "seconds": seconds,
+                "records_per_second": self.n_records / seconds if seconds else float("inf"),
+                "peak_bytes": peak_bytes,
+            }
+        return {"config": self.config(), "environment": self.environment(), "results": results}
+
+    @staticmethod
+    def measure(stage_fn, repeat=3) -> tuple:
+        # One traced run for peak memory (which also warms up), then the best of `repeat` timed runs
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        stage_fn()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stage_fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings), peak_bytes
+
+    @staticmethod
+    def environment() -> dict:
+        return {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                "machine": platform.machine(), "processor": platform.processor()}
+
+    def _stage_convert(self):
+        def stage():
+            OrderBookFeedConverter(self.book_bytes)._unpack_to_dataframe()
+            PublicTradeFeedConverter(self.trade_bytes)._unpack_to_dataframe()
+        return stage
+
+    def _stage_hdf5_roundtrip(self):
+        path = os.path.join(self.work_dir, "order_book.h5")
+        def stage():
+            HDF5Reader.write_data(path, self.order_book, table=True)
+            HDF5Reader.read_data(path)
+        return stage
+
+    def _stage_bin_data(self):
+        analyser = EventAnalyser(self.order_book.copy(), self.public_trade)
+        return analyser.bin_data
+
+    def _stage_as_of_lookup(self):
+        order_book = EventAnalyser(self.order_book.copy(), self.public_trade).order_book
+        times = order_book["Transaction time"].to_numpy()
+        timestamps = np.random.default_rng(self.seed).uniform(times[0], times[-1], len(times))
+        return lambda: EventAnalyser.get_most_recent_prices(timestamps, order_book)
+
+    def _stage_ema_crossover(self):
+        order_book = self.order_book.copy()
+        return lambda: DoubleEmaAnalyser(order_book, self.public_trade, 0.01, 0.08)
+
+    def _stage_event_extraction(self):
+        analyser = EventAnalyser(self.order_book.copy(), self.public_trade)
+        crossovers = DoubleEmaAnalyser(self.order_book.copy(), self.public_trade, 0.01, 0.08)
+        def stage():
+            analyser.select_events_data(analyser.analyse(save=False), [0.1, 0.2, 0.5, 1.0])
+            DoubleEmaAnalyser.filter_events(crossovers.get_events())
+        return stage
+
+    @staticmethod
+    def compare(baseline: dict, current: dict, tolerance=0.1) -> list:
+        # Stages whose throughput fell, or whose peak memory grew, by more than tolerance
+        regressions = []
+        for stage, result in current["results"].items():
+            reference = baseline["results"].get(stage)
+            if reference is None:
+                continue
+            if result["records_per_second"] < reference["records_per_second"] * (1 - tolerance):
+                regressions.append(f"{stage}: throughput {result['records_per_second']:,.0f} records/s "
+                                   f"vs baseline {reference['records_per_second']:,.0f}")
+            if result["peak_bytes"] > reference["peak_bytes"] * (1 + tolerance):
+                regressions.append(f"{stage}: peak memory {result['peak_bytes'] / 2**20:.1f} MiB "
+                                   f"vs baseline {reference['peak_bytes'] / 2**20:.1f} MiB")
+        return regressions
+
+    @staticmethod
+    def format_results(results: dict) -> str:
+        lines = []
+        for stage, result in results["results"].items():
+            lines.append(f"{stage:>16}: {result['seconds']:.4f} s, {result['records_per_second']:>14,.0f} records/s, "
+                         f"peak {result['peak_bytes'] / 2**20:.1f} MiB")
+        return "\n".join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the conversion and analysis pipeline on a synthetic feed")
+    parser.add_argument('-n', '--records', type=float, default=1e5)
+    parser.add_argument('-v', '--volatility', choices=sorted(VOLATILITY_REGIMES), default='normal')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--baseline', default='output/benchmark/baseline.json')
+    parser.add_argument('--update', action='store_true', help="overwrite the baseline with this run")
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help="allowed fractional drop in throughput or growth in peak memory")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    benchmark = Benchmark(args.records, args.volatility, args.seed, args.repeat)
+    results = benchmark.run(args.stages)
+    print(Benchmark.format_results(results))
+
+    if args.update or not os.path.exists(args.baseline):
+        if os.path.dirname(args.baseline):
+            os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=1)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline["config"] != results["config"]:
+        print(f"Baseline was recorded with {baseline['config']}, not comparable; rerun with --update", file=sys.stderr)
+        return 2
+    regressions = Benchmark.compare(baseline, results, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+class TimeBinner():
+    # Per-bin max, min, mean and argmax/argmin of a value column over fixed time buckets.
+    # The finest bucket size is computed from the rows in one sorted pass; each coarser
+    # size that is a whole multiple of the previous one is built by merging its bins.
+
+    def __init__(self, times, values, index=None, time_scale=1, value_name='Mid price'):
+        self.times = np.asarray(times)
+        self.values = np.asarray(values, dtype=float)
+        self.index = np.asarray(index) if index is not None else np.arange(len(self.times))
+        self.time_scale = time_scale
+        self.value_name = value_name
+
+    def bin(self, bucket_sizes: list) -> dict:
+        levels = {}
+        previous_size, previous_level = None, None
+        for bucket_size in sorted(bucket_sizes):
+            ratio = bucket_size / previous_size if previous_size else None
+            if ratio is not None and abs(ratio - round(ratio)) < 1e-9:
+                level = self.__merge_level(previous_level, int(round(ratio)))
+            else:
+                level = self.__row_level(bucket_size)
+            levels[bucket_size] = level
+            previous_size, previous_level = bucket_size, level
+        return {bucket_size: self.__to_frame(levels[bucket_size], bucket_size) for bucket_size in bucket_sizes}
+
+    def __bin_numbers(self, bucket_size):
+        return self.bin_numbers(self.times, self.times[0], bucket_size, self.time_scale)
+
+    @staticmethod
+    def bin_numbers(times, origin, bucket_size, time_scale=1):
+        # Bin of each time, counted from origin; other series can be aligned to the same bins
+        elapsed = np.asarray(times) - origin
+        if time_scale == 1:
+            return (elapsed / bucket_size).astype(int)
+        # Exact integer arithmetic on fixed-point timestamps
+        return TimeBinner.__truncated_division(elapsed, int(round(bucket_size * time_scale)))
+
+    @staticmethod
+    def __truncated_division(numerator, denominator):
+        # Integer division rounding towards zero, matching astype(int) on floats
+        return np.where(numerator < 0, -(-numerator // denominator), numerator // denominator)
+
+    @staticmethod
+    def __segment_starts(keys):
+        return np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+
+    @staticmethod
+    def __first_matching(candidates, is_match, starts, fill):
+        # First candidate per segment where is_match holds
+        return np.minimum.reduceat(np.where(is_match, candidates, fill), starts)
+
+    def __row_level(self, bucket_size):
+        bins = self.__bin_numbers(bucket_size)
+        order = None
+        if len(bins) > 1 and (bins[1:] < bins[:-1]).any():
+            # Stable sort keeps row order within each bin, as groupby does
+            order = np.argsort(bins, kind='stable')
+            bins = bins[order]
+        values = self.values if order is None else self.values[order]
+        positions = np.arange(len(values))
+        starts = self.__segment_starts(bins)
+        is_valid = ~np.isnan(values)
+        maxima = np.fmax.reduceat(values, starts)
+        minima = np.fmin.reduceat(values, starts)
+        counts = np.add.reduceat(is_valid.astype(np.int64), starts)
+        sizes = np.diff(np.append(starts, len(values)))
+        argmax = self.__first_matching(positions, values == np.repeat(maxima, sizes), starts, len(values))
+        argmin = self.__first_matching(positions, values == np.repeat(minima, sizes), starts, len(values))
+        if order is not None:
+            argmax, argmin = order[argmax], order[argmin]
+        return {
+            'bins': bins[starts],
+            'max': maxima,
+            'min': minima,
+            'sum': np.add.reduceat(np.where(is_valid, values, 0.0), starts),
+            'count': counts,
+            'argmax': argmax,
+            'argmin': argmin,
+        }
+
+    def __merge_level(self, level, ratio):
+        bins = self.__truncated_division(level['bins'], ratio)
+        starts = self.__segment_starts(bins)
+        sizes = np.diff(np.append(starts, len(bins)))
+        maxima = np.fmax.reduceat(level['max'], starts)
+        minima = np.fmin.reduceat(level['min'], starts)
+        # Finer bins are in time order, so the earliest extreme row has the smallest position
+        fill = len(self.values)
+        return {
+            'bins': bins[starts],
+            'max': maxima,
+            'min': minima,
+            'sum': np.add.reduceat(level['sum'], starts),
+            'count': np.add.reduceat(level['count'], starts),
+            'argmax': self.__first_matching(level['argmax'], level['max'] == np.repeat(maxima, sizes), starts, fill),
+            'argmin': self.__first_matching(level['argmin'], level['min'] == np.repeat(minima, sizes), starts, fill),
+        }
+
+    def __to_frame(self, level, bucket_size):
+        name = self.value_name
+        frame = pd.DataFrame({
+            f'{name}|max': level['max'],
+            f'{name}|min': level['min'],
+            f'{name}|mean': level['sum'] / level['count'],
+            f'{name}|idxmax': self.index[level['argmax']],
+            f'{name}|idxmin': self.index[level['argmin']],
+            'Max timestamp': self.times[level['argmax']],
+            'Min timestamp': self.times[level['argmin']],
+        }, index=pd.Index(level['bins'] * bucket_size, name='Time bin'))
+        return frame
@@ -0,0 +1,127 @@
+import os
+import glob
+import json
+import re
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from hdf5reader import HDF5Reader, TIME_COLUMN, to_time_units
+
+FEED_TYPES = ('order_book', 'public_trade')
+
+class DatasetCatalog():
+    # Index of partitioned HDF5 files (one feed per instrument per day). Each partition records
+    # its instrument, feed type, time range in seconds, row count, schema and time scale, so a
+    # query only opens the files that overlap the requested window.
+
+    def __init__(self, index_path, partitions: list = None):
+        self.index_path = index_path
+        self.partitions = partitions if partitions is not None else []
+
+    @classmethod
+    def load(cls, index_path):
+        with open(index_path) as file:
+            return cls(index_path, json.load(file)["partitions"])
+
+    def save(self):
+        with open(self.index_path, 'w') as file:
+            json.dump({"partitions": self.partitions}, file, indent=1)
+
+    def add(self, path, instrument, feed_type='order_book'):
+        # (Re)index one file, replacing any existing entry for the same path
+        partition = self.describe(path, instrument, feed_type)
+        self.partitions = [p for p in self.partitions if p["path"] != partition["path"]]
+        self.partitions.append(partition)
+        return partition
+
+    def scan(self, root, pattern='**/*.h5', instrument=None, instrument_level=0, instrument_pattern=None):
+        # Index every matching file under root; the feed type is taken from the file name. The
+        # instrument is the one given, else the 'instrument' group (or first group) of
+        # instrument_pattern searched in the path relative to root, else the directory
+        # instrument_level levels below root (root/ABC/day1/order_book.h5 is ABC at level 0)
+        for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+            feed_type = next((name for name in FEED_TYPES if name in os.path.basename(path)), None)
+            if feed_type is None:
+                continue
+            name = instrument or self.__instrument(os.path.relpath(path, root), instrument_level, instrument_pattern)
+            if self.__is_current(path):
+                continue
+            self.add(path, name, feed_type)
+        return self.partitions
+
+    @staticmethod
+    def __instrument(relative_path, level, pattern):
+        if pattern is not None:
+            match = re.search(pattern, relative_path)
+            if match is None:
+                raise ValueError(f"No instrument in {relative_path!r} for pattern {pattern!r}")
+            return match.group('instrument') if 'instrument' in match.re.groupindex else match.group(1)
+        directories = os.path.dirname(relative_path).split(os.sep) if os.path.dirname(relative_path) else []
+        if not -len(directories) <= level < len(directories):
+            raise ValueError(f"No directory at level {level} in {relative_path!r}, "
+                             "pass instrument or instrument_pattern")
+        return directories[level]
+
+    @staticmethod
+    def describe(path, instrument, feed_type) -> dict:
+        with pd.HDFStore(path, mode='r') as store:
+            storer = store.get_storer('df')
+            metadata = getattr(storer.attrs, 'metadata', {})
+            if storer.is_table:
+                times = store.select_column('df', TIME_COLUMN)
+                dtypes = store.select('df', start=0, stop=0).dtypes
+            else:
+                df = store.get('df')
+                times, dtypes = df[TIME_COLUMN], df.dtypes
+        time_scale = metadata.get("scales", {}).get(TIME_COLUMN, 1)
+        return {
+            "path": os.path.abspath(path),
+            "instrument": instrument,
+            "feed_type": feed_type,
+            "start_time": float(times.min() / time_scale) if len(times) else None,
+            "end_time": float(times.max() / time_scale) if len(times) else None,
+            "rows": int(len(times)),
+            "schema": {column: str(dtype) for column, dtype in dtypes.items()},
+            "time_scale": time_scale,
+            "mtime": os.path.getmtime(path),
+        }
+
+    def __is_current(self, path):
+        path = os.path.abspath(path)
+        return any(p["path"] == path and p["mtime"] == os.path.getmtime(path) for p in self.partitions)
+
+    def query(self, instrument, start_time=None, end_time=None, feed_type='order_book') -> list:
+        # Partitions overlapping [start_time, end_time) in seconds, in time order
+        selected = [
+            p for p in self.partitions
+            if p["instrument"] == instrument and p["feed_type"] == feed_type and p["rows"]
+            and (start_time is None or p["end_time"] >= start_time)
+            and (end_time is None or p["start_time"] < end_time)
+        ]
+        return sorted(selected, key=lambda p: p["start_time"])
+
+    def load_data(self, instrument, start_time=None, end_time=None, columns=None,
+                  feed_type='order_book', max_workers=None, use_threads=False) -> pd.DataFrame:
+        # Load the overlapping partitions concurrently and concatenate them in time order.
+        # Processes are the default since HDF5 reads are not reliably thread-safe.
+        partitions = self.query(instrument, start_time, end_time, feed_type)
+        if len({p["time_scale"] for p in partitions}) > 1:
+            raise ValueError("Partitions in the window mix fixed-point and float time columns")
+        if not partitions:
+            return pd.DataFrame(columns=columns)
+        jobs = [(p["path"], start_time, end_time, columns, p["time_scale"]) for p in partitions]
+        executor_cls = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+        with executor_cls(max_workers=max_workers) as executor:
+            frames = list(executor.map(_read_partition, jobs))
+        df = pd.concat(frames, ignore_index=True)
+        df.attrs.update(frames[0].attrs)
+        # The validation report and sorted/unique flags describe one partition's file, not the
+        # concatenation; readers check the order of the frames they are given themselves
+        for key in ("validation", "sorted", "unique"):
+            df.attrs.pop(key, None)
+        return df
+
+
+def _read_partition(job) -> pd.DataFrame:
+    path, start_time, end_time, columns, time_scale = job
+    return HDF5Reader.read_window(path, to_time_units(start_time, time_scale),
+                                  to_time_units(end_time, time_scale), columns)
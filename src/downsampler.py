@@ -0,0 +1,61 @@
+import numpy as np
+
+# Shape-preserving line downsampling for plotting. Both functions return the indices of the points
+# to keep, in order, so the caller can select x, y and any aligned arrays the same way.
+
+def min_max_indices(x, y, n_buckets: int) -> np.ndarray:
+    # M4 downsampling: the first, last, minimum and maximum point of each x bucket (one per pixel
+    # column). A line through these points rasterises the same as the full series.
+    x = _as_numbers(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= 4 * n_buckets:
+        return np.arange(n)
+    if n > 1 and (x[1:] >= x[:-1]).all() and x[-1] > x[0]:
+        buckets = ((x - x[0]) / (x[-1] - x[0]) * n_buckets).astype(np.int64)
+    else:
+        # Unsorted x is drawn in row order, so bucket by position instead
+        buckets = np.arange(n) * n_buckets // n
+    starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    segment = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    keep = [starts, ends]
+    for reduce in (np.fmax, np.fmin):
+        extreme = reduce.reduceat(y, starts)
+        positions = np.flatnonzero(y == extreme[segment])
+        # First occurrence of the extreme in each segment
+        _, first = np.unique(segment[positions], return_index=True)
+        keep.append(positions[first])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: keeps the point of each bucket that forms the largest
+    # triangle with the previously kept point and the mean of the next bucket
+    x = _as_numbers(x)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = np.nanmean(y[stop:next_stop]) if np.isfinite(y[stop:next_stop]).any() else y[previous]
+        areas = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        keep[i + 1] = previous
+    return keep
+
+
+def _as_numbers(x) -> np.ndarray:
+    # Datetimes are bucketed on their integer representation
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.view(np.int64).astype(float)
+    return x.astype(float)
@@ -0,0 +1,71 @@
+import numpy as np
+
+class EmaKernel():
+    # Time-decayed EMA and EW variance on irregular timestamps, for several halflives at once.
+    # Every running sum is a linear recurrence y[n] = a[n] * y[n-1] + b[n] with decay
+    # a[n] = 0.5 ** (dt[n] / halflife), solved for all halflives together by a vectorised
+    # odd-even reduction. Times are used as plain numbers (float seconds, or integer units with
+    # time_scale), so there is no per-row datetime conversion.
+
+    def __init__(self, times, values, halflives: list, time_scale=1):
+        self.values = np.asarray(values, dtype=float)
+        self.halflives = np.atleast_1d(np.asarray(halflives, dtype=float))
+        elapsed = np.diff(np.asarray(times)) / time_scale
+        # decay[n] is applied between rows n-1 and n; row 0 has no history
+        self.decay = np.zeros((len(self.values), len(self.halflives)))
+        self.decay[1:] = np.exp2(-elapsed[:, np.newaxis] / self.halflives)
+        self._weights = None
+
+    @staticmethod
+    def linear_recurrence(a, b):
+        # y[n] = a[n] * y[n-1] + b[n] along axis 0, with y[-1] = 0
+        n = len(b)
+        if n <= 1:
+            return np.array(b, dtype=float)
+        m = n // 2
+        # Fold rows pairwise: y[2k+1] = (a[2k+1] a[2k]) y[2k-1] + (a[2k+1] b[2k] + b[2k+1])
+        odd_a, even_a = a[1:2*m:2], a[0:2*m:2]
+        odd_y = EmaKernel.linear_recurrence(odd_a * even_a, odd_a * b[0:2*m:2] + b[1:2*m:2])
+        y = np.empty(np.shape(b))
+        y[1:2*m:2] = odd_y
+        y[0] = b[0]
+        y[2::2] = a[2::2] * odd_y[:(n - 1) // 2] + b[2::2]
+        return y
+
+    def __decayed_sum(self, values, decay=None):
+        decay = self.decay if decay is None else decay
+        return self.linear_recurrence(decay, np.broadcast_to(values[:, np.newaxis], decay.shape))
+
+    def weights(self):
+        # Sum of decayed weights up to each row, shared by mean and var
+        if self._weights is None:
+            self._weights = self.__decayed_sum(np.ones_like(self.values))
+        return self._weights
+
+    def mean(self) -> np.ndarray:
+        # Same as pandas ewm(halflife=..., times=...).mean() (adjust=True), one column per halflife.
+        # Solved for the deviation from the latest value, d[n] = c[n] * (d[n-1] + v[n-1] - v[n])
+        # with c[n] = decay[n] * W[n-1] / W[n]: over a flat stretch d only decays, so the mean
+        # becomes exactly the value once converged, as pandas does, instead of a ratio of large
+        # decayed sums that leaves rounding noise
+        weights = self.weights()
+        carry = np.zeros_like(weights)
+        carry[1:] = self.decay[1:] * weights[:-1] / weights[1:]
+        steps = np.zeros(len(self.values))
+        steps[1:] = self.values[:-1] - self.values[1:]
+        deviation = self.linear_recurrence(carry, carry * steps[:, np.newaxis])
+        return self.values[:, np.newaxis] + deviation
+
+    def var(self, bias: bool = False) -> np.ndarray:
+        # Exponentially weighted variance, bias corrected like pandas ewm().var() unless bias=True
+        centred = self.values - self.values[0]
+        weights = self.weights()
+        mean = self.__decayed_sum(centred) / weights
+        variance = np.maximum(self.__decayed_sum(centred ** 2) / weights - mean ** 2, 0.0)
+        if bias:
+            return variance
+        squared_weights = self.__decayed_sum(np.ones_like(self.values), self.decay ** 2)
+        denominator = weights ** 2 - squared_weights
+        with np.errstate(divide='ignore', invalid='ignore'):
+            correction = np.where(denominator > 0, weights ** 2 / denominator, np.nan)
+        return variance * correction
@@ -1,22 +1,49 @@
+import os
 import pandas as pd
 import numpy as np
-from hdf5reader import HDF5Reader
-from datetime import datetime, timedelta
+from hdf5reader import HDF5Reader, natural_name_warnings_ignored, to_time_units
+from binner import TimeBinner
+from trade_joiner import TradeJoiner
+from preprocessor import Preprocessor, OrderBookPreprocessor
+from peak_detector import detect_peaks, iter_chunks
+from profiler import StageProfiler, profiled
 from scipy import signal
 
+# Relative price change boundaries between event size buckets -4 to 4
+EVENT_SIZE_BUCKET_EDGES = [-0.0040, -0.0020, -0.0010, -0.0005, 0.0005, 0.0010, 0.0020, 0.0040]
+
+# Short and long EMAs closer than this, relative to the price, are equal: over a flat price
+# pandas' ewm recurrence can stall a few ULPs from the price, so smaller differences are rounding
+EMA_TIE_TOLERANCE = 1e-9
+
+# Columns of the analysers' own order book and public trade frames
+ORDER_BOOK_COLUMNS = ["Transaction time", "Bid price", "Ask price", "Mid price"]
+PUBLIC_TRADE_COLUMNS = ["Transaction time", "Trade qty", "Trade price"]
+
 class EventAnalyser():
-    def __init__(self, order_book: pd.DataFrame, public_trade: pd.DataFrame):
-        self.order_book = order_book
+    def __init__(self, order_book, public_trade, bucket_edges: list = EVENT_SIZE_BUCKET_EDGES):
+        # Inputs are DataFrames, or preprocessors shared between analysers so derived columns
+        # are computed once. The input frames are never modified: derived columns are added to
+        # this analyser's own frame.
+        self.preprocessor = order_book if isinstance(order_book, Preprocessor) else OrderBookPreprocessor(order_book)
+        self.order_book = self.preprocessor.select(ORDER_BOOK_COLUMNS)
+        if isinstance(public_trade, Preprocessor):
+            public_trade = public_trade.select(PUBLIC_TRADE_COLUMNS)
         self.public_trade = public_trade
-        self.__get_mid_price()
+        self.bucket_edges = bucket_edges
+        # Fixed-point data carries its scale factors in DataFrame.attrs
+        self.scales = self.order_book.attrs.get("scales", {})
+        self.time_scale = self.scales.get("Transaction time", 1)
 
-    def analyse(self):
-        self.bin_data()
+    @profiled("analyse", rows_in=lambda self, *args, **kwargs: len(self.order_book), rows_out=len)
+    def analyse(self, save: bool = True, bucket_size = 0.1):
+        self.bin_data(bucket_size)
         self.get_direction()
         self.__event_end_times(self.binned_data)
         self.__event_end_prices(self.binned_data)
-        self.__assign_event_size_buckets(self.binned_data)
-        self.save_to_xls([0.1, 0.2, 0.5, 1.0])
+        self.__assign_event_size_buckets(self.binned_data, self.bucket_edges)
+        if save:
+            self.save_to_xls([0.1, 0.2, 0.5, 1.0])
         return self.binned_data
         
     @staticmethod
@@ -24,59 +51,74 @@ class EventAnalyser():
         df['Relative price change'] = (df['Mid price|max'] - df['Mid price|min']) / df['Mid price|mean']
         return df['Relative price change']
 
-    @staticmethod
-    def __mid_price(df):
-        df['Mid price'] = 0.5 * (df['Bid price'] + df['Ask price'])
-        return df['Mid price']
-    
-    def __get_mid_price(self):
-        return self.__mid_price(self.order_book)
+    def ema_kernel(self, halflives: list):
+        # Time-decayed EMA/EWVar of the mid price, on 'Transaction time' without datetime conversion
+        return self.preprocessor.ema_kernel(halflives)
     
+    def trade_joiner(self):
+        # Trades aligned to the prevailing order book quotes
+        return TradeJoiner(self.order_book, self.public_trade)
+
+    @profiled("trade_features", rows_in=lambda self, *args, **kwargs: len(self.public_trade), rows_out=len)
+    def get_trade_features(self, bucket_size = 0.1):
+        # Trade volume, count, VWAP and signed flow per bin, joined onto the binned table by 'Time bin'
+        return self.trade_joiner().bin_features(bucket_size)
+
+    @profiled("event_trade_features", rows_in=lambda self, df, *args, **kwargs: len(df), rows_out=len)
+    def get_event_trade_features(self, df, time_delay = None):
+        # Trade features from P0 to P1 of each event, or over time_delay seconds after P1 when given
+        end_times = df[["Max timestamp", "Min timestamp"]].max(axis=1).to_numpy()
+        if time_delay is None:
+            start_times = df[["Max timestamp", "Min timestamp"]].min(axis=1).to_numpy()
+        else:
+            start_times, end_times = end_times, end_times + to_time_units(time_delay, self.time_scale)
+        features = self.trade_joiner().window_features(start_times, end_times)
+        features.index = df.index
+        return features
+
     @staticmethod
     def __rebase_time_column(df, column_name, init_time):
         # Make time series column values relative to inital time
         df[column_name] = df[column_name] - init_time
         return df[column_name]
 
+    @profiled("bin_data", rows_in=lambda self, *args, **kwargs: len(self.order_book), rows_out=len)
     def bin_data(self, bucket_size = 0.1):
         # Split data into discrete discrete bins of specified time interval
-        init_time = self.order_book.iloc[0]["Transaction time"]
-        self.order_book['Time bin'] = ((self.order_book['Transaction time'] - init_time)/bucket_size).astype(int) * bucket_size
-        self.binned_data = self.order_book.copy(deep=True).groupby('Time bin').agg({
-            'Mid price': ('max', 'min', 'mean', 'idxmax', 'idxmin'),
-            })
-        self.binned_data.columns = self.binned_data.columns.map('|'.join).str.strip('|')
-        self.__relative_price_change(self.binned_data)
-        self.__min_max_timestamps()
+        self.bucket_size = bucket_size
+        self.binned_data = self.bin_data_levels([bucket_size])[bucket_size]
+        with StageProfiler.stage("min_max_timestamps", len(self.binned_data)):
+            self.min_max_time_stamps = self.binned_data[['Max timestamp', 'Min timestamp']]
         return self.binned_data
+
+    def bin_data_levels(self, bucket_sizes: list) -> dict:
+        # Binned tables keyed by bucket size; coarser sizes are merged from finer bins
+        binner = TimeBinner(self.order_book['Transaction time'].to_numpy(),
+                            self.order_book['Mid price'].to_numpy(),
+                            index=self.order_book.index,
+                            time_scale=self.time_scale)
+        levels = binner.bin(bucket_sizes)
+        return {bucket_size: self.__binned_table(level) for bucket_size, level in levels.items()}
+
+    def __binned_table(self, df):
+        self.__relative_price_change(df)
+        return df[['Mid price|max', 'Mid price|min', 'Mid price|mean', 'Mid price|idxmax', 'Mid price|idxmin',
+                   'Relative price change', 'Max timestamp', 'Min timestamp']]
     
-    def __min_max_timestamps(self):
-        max_time_stamps = self.order_book.iloc[self.binned_data['Mid price|idxmax']]['Transaction time'].reset_index(drop=True)
-        max_time_stamps.name = 'Max timestamp'
-        min_time_stamps = self.order_book.iloc[self.binned_data['Mid price|idxmin']]['Transaction time'].reset_index(drop=True)
-        min_time_stamps.name = 'Min timestamp'
-        self.min_max_time_stamps = pd.concat([max_time_stamps, min_time_stamps], axis=1)
-        self.min_max_time_stamps.index = self.binned_data.index
-        self.binned_data = pd.concat([self.binned_data, self.min_max_time_stamps], axis=1)
-        return self.min_max_time_stamps
-    
-    @staticmethod
-    def __direction(row):
-        if row['Min timestamp'] <= row['Max timestamp']:
-            return 1
-        elif row['Min timestamp'] > row['Max timestamp']:
-            return -1
-        
+    @profiled("direction", rows_in=lambda self: len(self.binned_data))
     def get_direction(self):
-        self.binned_data['Direction'] = self.binned_data.apply(self.__direction, axis=1)
+        # Up (1) when the minimum comes no later than the maximum, down (-1) otherwise
+        self.binned_data['Direction'] = np.where(self.binned_data['Min timestamp'] <= self.binned_data['Max timestamp'], 1, -1)
         self.binned_data['Relative price change'] *= self.binned_data['Direction']
 
     @staticmethod
+    @profiled("event_end_times", rows_in=len)
     def __event_end_times(df):
         df["Event end time"] = df[["Max timestamp", "Min timestamp"]].max(axis=1)
         return df["Event end time"]
     
     @staticmethod
+    @profiled("event_end_prices", rows_in=len)
     def __event_end_prices(df):
         conditions = [
             (df['Direction'] == 1),
@@ -103,46 +145,59 @@ class EventAnalyser():
     
 
     @staticmethod
-    def __assign_event_size_buckets(df):
-        # Define the ranges and corresponding values
-        conditions = [
-            (df['Relative price change'] < -0.0040),
-            (df['Relative price change'] >= -0.0040) & (df['Relative price change'] < -0.0020),
-            (df['Relative price change'] >= -0.0020) & (df['Relative price change'] < -0.0010),
-            (df['Relative price change'] >= -0.0010) & (df['Relative price change'] < -0.0005),
-            (df['Relative price change'] >= -0.0005) & (df['Relative price change'] < 0.0005),
-            (df['Relative price change'] >= 0.0005) & (df['Relative price change'] < 0.0010),
-            (df['Relative price change'] >= 0.0010) & (df['Relative price change'] < 0.0020),
-            (df['Relative price change'] >= 0.0020) & (df['Relative price change'] < 0.0040),
-            (df['Relative price change'] >= 0.0040)
-        ]
-        values = [
-            -4,  # For range: Relative price change < -0.0040
-            -3,  # For range: -0.0040 <= Relative price change < -0.0020
-            -2,  # For range: -0.0020 <= Relative price change < -0.0010
-            -1,  # For range: -0.0010 <= Relative price change < -0.0005
-            0,   # For range: -0.0005 <= Relative price change < 0.0005
-            1,   # For range: 0.0005 <= Relative price change < 0.0010
-            2,   # For range: 0.0010 <= Relative price change < 0.0020
-            3,   # For range: 0.0020 <= Relative price change < 0.0040
-            4    # For range: Relative price change >= 0.0040
-        ]
-        df['Event size bucket'] = np.select(conditions, values, default=0)
+    @profiled("event_size_buckets", rows_in=lambda df, edges: len(df))
+    def __assign_event_size_buckets(df, edges):
+        # Single binary search over the edges; buckets are numbered so the one containing zero is 0
+        df['Event size bucket'] = EventAnalyser.event_size_buckets(df['Relative price change'].to_numpy(), edges)
         return df
+
+    @staticmethod
+    def event_size_buckets(change, edges=EVENT_SIZE_BUCKET_EDGES) -> np.ndarray:
+        edges = np.asarray(edges)
+        zero_bucket = np.searchsorted(edges, 0, side='right')
+        buckets = np.searchsorted(edges, change, side='right') - zero_bucket
+        return np.where(np.isnan(change), 0, buckets)
+
+    @staticmethod
+    def event_size_bucket_labels(edges=EVENT_SIZE_BUCKET_EDGES) -> dict:
+        # Interval label for each event size bucket number
+        bounds = ["-∞"] + [f"{edge:.4f}" for edge in edges] + ["∞"]
+        zero_bucket = int(np.searchsorted(edges, 0, side='right'))
+        labels = {}
+        for i in range(len(edges) + 1):
+            opening = "(" if i == 0 else "["
+            labels[i - zero_bucket] = f"{opening}{bounds[i]}, {bounds[i + 1]})"
+        return labels
     
     @staticmethod
     def get_most_recent_price(timestamp, order_book):
-        mask = order_book['Transaction time'] <= timestamp
-        if mask.any():
-            nearest_time = order_book.loc[mask, 'Transaction time'].max()
-            recent_price = order_book.loc[order_book['Transaction time'] == nearest_time, 'Mid price'].values[0]
-            return recent_price
-        else:
+        prices, _ = EventAnalyser.get_most_recent_prices([timestamp], order_book)
+        return prices[0]
+
+    @staticmethod
+    @profiled("as_of_lookup", rows_in=lambda timestamps, order_book: len(timestamps))
+    def get_most_recent_prices(timestamps, order_book):
+        # As-of lookup for a batch of timestamps: the first row at the latest 'Transaction time' <= timestamp
+        times = order_book['Transaction time'].to_numpy()
+        order = None
+        # The O(n) order check is kept even for feeds flagged sorted: attrs survive reordering
+        # (sort_values, reindex, concat), so the flag may no longer describe this frame
+        if len(times) > 1 and (times[1:] < times[:-1]).any():
+            # Stable sort keeps the original row order among equal times
+            order = np.argsort(times, kind='stable')
+            times = times[order]
+        positions = np.searchsorted(times, np.asarray(timestamps), side='right') - 1
+        if (positions < 0).any():
             raise ValueError("There is no 'Transaction time' in the DataFrame that is less than or equal to the input timestamp.")
+        positions = np.searchsorted(times, times[positions], side='left')
+        if order is not None:
+            positions = order[positions]
+        prices = order_book['Mid price'].to_numpy()[positions]
+        return prices, positions
 
     def get_post_event_relative_price_change(self, df, time_delay):
-        post_event_timestamps = df["Event end time"] + time_delay
-        df["Post event price"] = post_event_timestamps.apply(self.get_most_recent_price, args=(self.order_book, ))
+        post_event_timestamps = df["Event end time"] + to_time_units(time_delay, self.time_scale)
+        df["Post event price"], _ = self.get_most_recent_prices(post_event_timestamps, self.order_book)
         # (P2 - P0) / (P1 - P0)
         df["Post event relative price change"] = (df["Post event price"] - df["Event end price"]) / (df["Event end price"] * df["Relative price change"])
         return df["Post event relative price change"]
@@ -152,21 +207,81 @@ class EventAnalyser():
         self.get_post_event_relative_price_change(sized, time_delay)
         return sized["Post event relative price change"]
     
+    @profiled("post_event_prices", rows_in=lambda self, end_times, time_delays: len(end_times) * len(time_delays))
+    def get_post_event_prices(self, end_times, time_delays: list):
+        # P2 for every (event, delay) pair from one batched as-of lookup, shape (events, delays)
+        offsets = np.array([to_time_units(time_delay, self.time_scale) for time_delay in time_delays])
+        post_event_timestamps = np.asarray(end_times)[:, np.newaxis] + offsets
+        prices, _ = self.get_most_recent_prices(post_event_timestamps.ravel(), self.order_book)
+        return prices.reshape(post_event_timestamps.shape)
+
+    @staticmethod
+    def __delay_label(time_delay):
+        return f"at {time_delay*1000} ms"
+
+    @profiled("select_events", rows_in=lambda self, df, time_delays: len(df), rows_out=len)
+    def select_events_data(self, df, time_delays: list):
+        # One row per event with P2 and (P2-P0)/(P1-P0) columns for each delay
+        events = df[df["Event size bucket"] != 0].copy()
+        self.__event_start_times(events)
+        self.__event_start_prices(events)
+        self.__event_end_prices(events)
+        selection = pd.DataFrame({
+            "P0 Timestamp": events["Event start time"],
+            "P0": events["Event start price"],
+            "P1": events["Event end price"],
+        })
+        post_event_prices = self.get_post_event_prices(events["Event end time"], time_delays)
+        for i, time_delay in enumerate(time_delays):
+            label = self.__delay_label(time_delay)
+            selection[f"P2 {label}"] = post_event_prices[:, i]
+            selection[f"P2-P0/P1-P0 {label}"] = (selection[f"P2 {label}"] - selection["P0"])/(selection["P1"] - selection["P0"])
+        return selection
+
     def select_xls_data(self, df, time_delay):
-        df["P0 Timestamp"] = self.__event_start_times(self.binned_data)
-        df["P0"] = self.__event_start_prices(df)
-        df["P1"] = self.__event_end_prices(df)
-        post_event_timestamps = df["Event end time"] + time_delay
-        df["P2"] = np.apply(self.get_most_recent_price, args=(self.order_book, ))
-        df["P2-P0/P1-P0"] = (df["P2"] - df["P0"])/(df["P1"] - df["P0"])
-        df = df[df["Event size bucket"] != 0]
-        return df[["P0 Timestamp", "P0", "P1", "P2", "P2-P0/P1-P0"]]
-    
-    def save_to_xls(self, time_delays: list):
-        with pd.ExcelWriter("output/xls/events_data.xlsx", mode='w') as writer:
+        label = self.__delay_label(time_delay)
+        selection = self.select_events_data(df, [time_delay])
+        return selection.rename(columns={f"P2 {label}": "P2", f"P2-P0/P1-P0 {label}": "P2-P0/P1-P0"})
+
+    @profiled("save_events", rows_out=len)
+    def save_events(self, path, time_delays: list):
+        # Columnar output for large event tables; format is taken from the file extension
+        selection = self.select_events_data(self.binned_data, time_delays)
+        extension = os.path.splitext(path)[1]
+        if extension == ".parquet":
+            selection.to_parquet(path)
+        elif extension == ".feather":
+            selection.reset_index().to_feather(path)
+        elif extension in (".h5", ".hdf5"):
+            with natural_name_warnings_ignored():
+                selection.to_hdf(path, key="events", mode="w", format="table")
+        elif extension == ".xlsx":
+            self.__write_xls(path, selection, time_delays)
+        else:
+            raise ValueError(f"Unsupported events output format: '{extension}'")
+        return selection
+
+    @profiled("excel_export", rows_in=lambda self, path, selection, time_delays: len(selection) * len(time_delays))
+    def __write_xls(self, path, selection, time_delays):
+        # Excel is limited to ~1M rows per sheet and slow to write, so keep it for small outputs
+        with pd.ExcelWriter(path, mode='w') as writer:
             for time_delay in time_delays:
-                df_selection = self.select_xls_data(self.binned_data, time_delay)
-                df_selection.to_excel(writer, sheet_name=f"P2 at {time_delay*1000} ms", index = False)
+                label = self.__delay_label(time_delay)
+                sheet = selection[["P0 Timestamp", "P0", "P1", f"P2 {label}", f"P2-P0/P1-P0 {label}"]]
+                sheet = sheet.rename(columns={f"P2 {label}": "P2", f"P2-P0/P1-P0 {label}": "P2-P0/P1-P0"})
+                sheet.to_excel(writer, sheet_name=f"P2 {label}", index = False)
+
+    def save_to_xls(self, time_delays: list):
+        self.save_events("output/xls/events_data.xlsx", time_delays)
+
+    def store_binned_events(self, event_store, source=None, source_hash=None, instrument=None) -> int:
+        # Append the analysed bins to an EventStore, unless this run is already stored
+        params = {"bucket_size": self.bucket_size, "bucket_edges": list(self.bucket_edges)}
+        run_id = event_store.find_run("binned", params, source_hash) if source_hash is not None else None
+        if run_id is None:
+            run_id = event_store.append(self.binned_data, "binned", params, self.time_scale,
+                                        source, source_hash, instrument, self.bucket_edges)
+        return run_id
 
 
 class DoubleEmaAnalyser(EventAnalyser):
@@ -176,77 +291,106 @@ class DoubleEmaAnalyser(EventAnalyser):
 
     def get_ema(self, halflife: float, is_short_ema: bool):
         col_name = "EMA Short" if is_short_ema else "EMA Long"
-        halflife = timedelta(seconds=halflife)
-        times = self.order_book["Transaction time"].map(datetime.fromtimestamp)
-        self.order_book[col_name] = self.order_book["Mid price"].ewm(halflife=halflife, 
-                                                                     times = times).mean()
+        self.order_book[col_name] = self.preprocessor.ema([halflife])[:, 0]
         return self.order_book[col_name]
     
+    @profiled("double_ema", rows_in=lambda self, *args, **kwargs: len(self.order_book))
     def get_double_ema(self, hl_short, hl_long):
-        self.get_ema(hl_short, True)
-        self.get_ema(hl_long, False)
+        # Both halflives in one kernel pass
+        ema = self.preprocessor.ema([hl_short, hl_long])
+        self.order_book["EMA Short"] = ema[:, 0]
+        self.order_book["EMA Long"] = ema[:, 1]
     
     @staticmethod
+    @profiled("ema_crossovers", rows_in=lambda short_ema, long_ema: len(short_ema),
+              rows_out=lambda idx: len(idx[0]) + len(idx[1]))
     def get_ema_intersection_points(short_ema: pd.Series, long_ema: pd.Series):
-        intersections = np.diff(np.heaviside(short_ema - long_ema, 0))
+        short_ema, long_ema = np.asarray(short_ema, dtype=float), np.asarray(long_ema, dtype=float)
+        difference = short_ema - long_ema
+        difference[np.abs(difference) <= EMA_TIE_TOLERANCE * np.abs(long_ema)] = 0.0
+        intersections = np.diff(np.heaviside(difference, 0))
         up_intersections = np.heaviside(intersections, 0)
         down_intersections = np.heaviside(-intersections, 0)
         idx_ups = np.argwhere(up_intersections).flatten()
         idx_downs = np.argwhere(down_intersections).flatten()
         return idx_ups, idx_downs
 
+    @profiled("crossover_events", rows_out=len)
     def get_events(self):
-        idx_arr = np.concatenate((self.idx_ups, self.idx_downs))
+        self.events = self.events_from_crossovers(self.order_book["Transaction time"].to_numpy(),
+                                                  self.order_book["Mid price"].to_numpy(),
+                                                  self.idx_ups, self.idx_downs, self.time_scale)
+        return self.events
+
+    @staticmethod
+    def events_from_crossovers(times, prices, idx_ups, idx_downs, time_scale=1):
+        # One event between each pair of consecutive EMA crossovers
+        idx_arr = np.concatenate((idx_ups, idx_downs))
         idx_arr.sort(kind = 'mergesort')
         start_idx = idx_arr[:-1]
         end_idx = idx_arr[1:]
-        start_times = self.order_book["Transaction time"][start_idx].reset_index(drop = True)
-        end_times = self.order_book["Transaction time"][end_idx].reset_index(drop = True)
-        start_prices = self.order_book["Mid price"][start_idx].reset_index(drop = True)
-        end_prices = self.order_book["Mid price"][end_idx].reset_index(drop = True)
-        self.events = pd.DataFrame({
+        start_times = times[start_idx]
+        end_times = times[end_idx]
+        start_prices = prices[start_idx]
+        end_prices = prices[end_idx]
+        return pd.DataFrame({
             "Start idx": start_idx,
             "End idx": end_idx,
             "Start time": start_times,
             "End time": end_times,
             "Start price": start_prices,
             "End price": end_prices,
-            "Duration": end_times - start_times,
+            "Duration": (end_times - start_times) / time_scale,
             "Relative price change": (end_prices - start_prices)/start_prices
         })
-        return self.events
     
-    def filter_events(self, events, max_time = 1.0, min_price_std = 1.5):
+    @staticmethod
+    @profiled("filter_events", rows_in=lambda events, *args, **kwargs: len(events), rows_out=len)
+    def filter_events(events, max_time = 1.0, min_price_std = 1.0):
+        # Short events whose price change is more than min_price_std standard deviations from the
+        # mean. The default of one standard deviation is the threshold this always used.
         filter_1 = events[events["Duration"] < max_time]
         mean = np.mean(filter_1["Relative price change"])
         std = np.std(filter_1["Relative price change"])
-        upper_boundary = mean + std
-        lower_boundary = mean - std
+        upper_boundary = mean + min_price_std * std
+        lower_boundary = mean - min_price_std * std
         filtered_data = filter_1[(filter_1["Relative price change"] > upper_boundary) | (filter_1["Relative price change"] < lower_boundary)]
         return filtered_data
 
+    def store_crossover_events(self, event_store, source=None, source_hash=None, instrument=None) -> int:
+        # Append the crossover events to an EventStore, unless this run is already stored
+        params = {"halflife_short": self.halflives[0], "halflife_long": self.halflives[1]}
+        run_id = event_store.find_run("crossover", params, source_hash) if source_hash is not None else None
+        if run_id is None:
+            run_id = event_store.append(self.get_events(), "crossover", params, self.time_scale,
+                                        source, source_hash, instrument, self.bucket_edges)
+        return run_id
+
     def analyse_init(self, hl_1, hl_2):
+        self.halflives = (hl_1, hl_2)
         self.get_double_ema(hl_1, hl_2)
         self.idx_ups, self.idx_downs = self.get_ema_intersection_points(self.order_book["EMA Short"], self.order_book["EMA Long"])
 
 
 class EmaVarianceAnalyser(EventAnalyser):
     
-    def get_ema_variance(self, halflife, alpha):
-        halflife = timedelta(seconds=halflife)
-        times = self.order_book["Transaction time"].map(datetime.fromtimestamp)
-        ema_variance = self.order_book["Mid price"].ewm(halflife=halflife,
-                                                        alpha=alpha, 
-                                                        times = times).var()
+    @profiled("ema_variance", rows_in=lambda self, *args, **kwargs: len(self.order_book))
+    def get_ema_variance(self, halflife):
+        # pandas ewm() cannot compute var() with times, so this uses the time-decayed kernel
+        ema_variance = pd.Series(self.preprocessor.ema_variance(halflife), index=self.order_book.index)
         return ema_variance
     
     @staticmethod
     def variance_peaks(variance):
-        peaks, _ = signal.find_peaks(variance)
         min_height = variance.mean() + 2 * variance.std()
         peaks, _ = signal.find_peaks(variance, height = min_height)
         peak_widths = signal.peak_widths(variance, peaks, rel_height=0.99)
         return peaks, min_height, peak_widths
+
+    @staticmethod
+    def variance_peaks_streaming(variance, chunk_size=100_000, **detector_params):
+        # Forward-pass alternative to variance_peaks with a rolling threshold and bounded memory
+        return detect_peaks(iter_chunks(np.asarray(variance), chunk_size), **detector_params)
     
 
 if __name__ == "__main__":
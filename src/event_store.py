@@ -0,0 +1,138 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from event_analyser import EventAnalyser, EVENT_SIZE_BUCKET_EDGES
+from hdf5reader import HDF5Reader, natural_name_warnings_ignored
+
+# Columns every stored event table has and is indexed on; times and durations are in seconds
+INDEX_COLUMNS = ["Start time", "Event size bucket", "Duration"]
+RUN_COLUMN = "Run id"
+EVENT_KINDS = ("crossover", "binned")
+# Condition variables of the indexed columns in query conditions
+CONDITION_COLUMNS = {'t': "Start time", 'b': "Event size bucket", 'd': "Duration", 'r': RUN_COLUMN}
+
+class EventStore():
+    # Event tables appended to one HDF5 file, a table per kind of event (EMA crossover events,
+    # binned events). Each append is a run with its detection parameters and provenance
+    # (source, its content hash, instrument, time written), so detection on the same data with
+    # the same parameters can be found and skipped. Start time, size bucket and duration are
+    # PyTables-indexed columns: range and bucket queries only read the matching rows.
+    # One writer at a time; readers open the file read-only.
+
+    def __init__(self, path='output/events.h5'):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def append(self, events: pd.DataFrame, kind: str, params: dict = None, time_scale=1,
+               source=None, source_hash=None, instrument=None,
+               bucket_edges: list = EVENT_SIZE_BUCKET_EDGES) -> int:
+        # Store one run of events and return its run id
+        if kind not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind {kind!r}, expected one of {EVENT_KINDS}")
+        table = self.normalise(events, kind, time_scale, bucket_edges)
+        with pd.HDFStore(self.path, 'a') as store:
+            runs = self.__read_runs(store)
+            run_id = max((run["run_id"] for run in runs), default=-1) + 1
+            table[RUN_COLUMN] = run_id
+            if len(table):
+                with natural_name_warnings_ignored():
+                    store.append(kind, table, format='table', data_columns=INDEX_COLUMNS + [RUN_COLUMN], index=False)
+                    store.create_table_index(kind, columns=INDEX_COLUMNS, optlevel=9, kind='full')
+            runs.append({
+                "run_id": run_id,
+                "kind": kind,
+                "params": dict(params or {}),
+                "source": os.path.abspath(source) if source is not None else None,
+                "source_hash": source_hash,
+                "instrument": instrument,
+                "rows": len(table),
+                "created": time.time(),
+            })
+            store.root._v_attrs.runs = runs
+        return run_id
+
+    @staticmethod
+    def normalise(events: pd.DataFrame, kind: str, time_scale=1, bucket_edges: list = EVENT_SIZE_BUCKET_EDGES):
+        # Copy of an event table with the index columns added and times in seconds
+        if kind == "crossover":
+            # DoubleEmaAnalyser.get_events: duration is already in seconds
+            table = events.reset_index(drop=True)
+            table["Start time"] = table["Start time"] / time_scale
+            table["End time"] = table["End time"] / time_scale
+            table["Event size bucket"] = EventAnalyser.event_size_buckets(
+                table["Relative price change"].to_numpy(), bucket_edges)
+        else:
+            # EventAnalyser.binned_data after analyse: one row per time bin, start and end at the extremes
+            table = events.reset_index()
+            extremes = table[["Max timestamp", "Min timestamp"]]
+            table["Start time"] = extremes.min(axis=1) / time_scale
+            table["Duration"] = (extremes.max(axis=1) - extremes.min(axis=1)) / time_scale
+        table["Start time"] = table["Start time"].astype(float)
+        table["Duration"] = table["Duration"].astype(float)
+        table["Event size bucket"] = table["Event size bucket"].astype(np.int64)
+        return table
+
+    def find_run(self, kind: str, params: dict = None, source_hash=None):
+        # Id of the latest run of this kind with these parameters on the same data, if any
+        matches = [run["run_id"] for run in self.runs()
+                   if run["kind"] == kind and run["params"] == dict(params or {})
+                   and run["source_hash"] == source_hash]
+        return matches[-1] if matches else None
+
+    def runs(self) -> list:
+        if not os.path.exists(self.path):
+            return []
+        with pd.HDFStore(self.path, 'r') as store:
+            return self.__read_runs(store)
+
+    @staticmethod
+    def __read_runs(store) -> list:
+        return list(getattr(store.root._v_attrs, 'runs', []))
+
+    def query(self, kind: str, start_time=None, end_time=None, buckets: list = None,
+              min_duration=None, max_duration=None, run_ids: list = None, columns: list = None) -> pd.DataFrame:
+        # Events with start_time <= Start time < end_time (seconds), in the given size buckets,
+        # with min_duration <= Duration < max_duration and from the given runs
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=columns)
+        with pd.HDFStore(self.path, 'r') as store:
+            if kind not in store or any(values is not None and len(values) == 0 for values in (buckets, run_ids)):
+                return pd.DataFrame(columns=columns)
+            condition, bound = self.__condition(start_time, end_time, buckets, min_duration, max_duration, run_ids)
+            coordinates = None
+            if condition is not None:
+                coordinates = HDF5Reader.where_coordinates(store, kind, condition, CONDITION_COLUMNS, bound)
+            return HDF5Reader.select_coordinates(store, kind, coordinates, columns)
+
+    @staticmethod
+    def __condition(start_time, end_time, buckets, min_duration, max_duration, run_ids):
+        # PyTables condition over the indexed columns, and the values it refers to
+        bound = {}
+        conditions = []
+        for term, name, value in (('(t >= start_time)', 'start_time', start_time),
+                                  ('(t < end_time)', 'end_time', end_time),
+                                  ('(d >= min_duration)', 'min_duration', min_duration),
+                                  ('(d < max_duration)', 'max_duration', max_duration)):
+            if value is not None:
+                conditions.append(term)
+                bound[name] = value
+        for values, column in ((buckets, 'b'), (run_ids, 'r')):
+            if values is not None:
+                conditions.append('(' + ' | '.join(f'({column} == {int(value)})' for value in values) + ')')
+        return (' & '.join(conditions) if conditions else None), bound
+
+    def delete_run(self, run_id: int):
+        with pd.HDFStore(self.path, 'a') as store:
+            runs = self.__read_runs(store)
+            run = next((run for run in runs if run["run_id"] == run_id), None)
+            if run is None:
+                return
+            if run["kind"] in store and run["rows"]:
+                coordinates = HDF5Reader.where_coordinates(store, run["kind"], '(r == run_id)',
+                                                           {'r': RUN_COLUMN}, {'run_id': run_id})
+                with natural_name_warnings_ignored():
+                    # Removing rows rebuilds the column indexes
+                    store.remove(run["kind"], where=coordinates)
+            store.root._v_attrs.runs = [run for run in runs if run["run_id"] != run_id]
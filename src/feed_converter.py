@@ -1,72 +1,232 @@
 #!/usr/bin/env python3
 import os
+import argparse
+import glob
 import sys
-import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 from hdf5reader import HDF5Reader
+from profiler import StageProfiler, profiled
 
 class FeedConverter():
 
-    def __init__(self, data, form: str, column_names: list):
+    # Whether Seq Ids number every record of the feed, so that a jump between them is a gap
+    contiguous_seq_ids = True
+
+    def __init__(self, data, dtype: np.dtype, scales: dict, chunk_size: int = None,
+                 fixed_point: bool = False, validate: bool = True):
+        # data is a bytes-like buffer, or with chunk_size set, a file path or binary stream
         self.data = data
-        self.form = form
-        self.column_names = column_names
+        self.dtype = dtype
+        self.scales = scales
+        self.chunk_size = chunk_size
+        self.fixed_point = fixed_point
+        self.validate = validate
+        self.seq_id_base = None
+        self.column_names = list(dtype.names)
+        self.validation = {"records": 0, "out_of_order": 0, "duplicates": 0, "sequence_gaps": 0,
+                           "missing_records": 0, "replayed": 0,
+                           "sorted": True, "unique": True}
+        # Last (Transaction time, Seq Id) and highest Seq Id written, carried across chunks
+        self.last_key = None
+        self.max_seq_id = None
 
-    def convert(self):
-        self._unpack_to_dataframe()
-        self._save_to_hdfstore()
+    @profiled("convert", rows_in=lambda self, *args, **kwargs: self._record_count())
+    def convert(self, path=None):
+        if self.chunk_size is None:
+            self._unpack_to_dataframe()
+        if path is None:
+            self._save_to_hdfstore()
+        else:
+            self._save_to_hdfstore(path)
 
     def _save_to_csv(self, path):
-        self.df.to_csv(path, index=False)
-
-    def _unpack_row(self, fields):
-        pass
-        
-    def _unpack_to_arr(self):
-        self.data_arr = np.array(
-            [self._unpack_row(fields) for fields in struct.iter_unpack(self.form, self.data)]
-        )
+        if self.chunk_size is None:
+            self.df.to_csv(path, index=False)
+        else:
+            for i, df in enumerate(self._iter_dataframes()):
+                df.to_csv(path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+
+    def _unpack_to_arr(self) -> np.ndarray:
+        # View the raw bytes as structured records, without copying
+        self.data_arr = np.frombuffer(self.data, dtype=self.dtype)
         return self.data_arr
-    
+
+    def _scale_columns(self, arr: np.ndarray) -> dict:
+        # Convert fixed-point integer fields to floats, one column at a time
+        if self.fixed_point:
+            return self._fixed_point_columns(arr)
+        columns = {}
+        for name in self.column_names:
+            scale = self.scales.get(name)
+            columns[name] = arr[name] / scale if scale else arr[name].astype(np.int64)
+        return columns
+
+    def _fixed_point_columns(self, arr: np.ndarray) -> dict:
+        # Keep raw int64 values, with Seq Id stored as an int32 offset from the first record
+        columns = {}
+        for name in self.column_names:
+            if name == "Seq Id":
+                columns[name] = self._seq_id_offsets(arr[name])
+            else:
+                columns[name] = arr[name].astype(np.int64)
+        return columns
+
+    def _seq_id_offsets(self, seq_ids: np.ndarray) -> np.ndarray:
+        if self.seq_id_base is None:
+            self.seq_id_base = int(seq_ids[0]) if len(seq_ids) else 0
+        offsets = seq_ids.astype(np.int64) - self.seq_id_base
+        if len(offsets) and (offsets.min() < np.iinfo(np.int32).min or offsets.max() > np.iinfo(np.int32).max):
+            raise OverflowError("Seq Id range does not fit in int32 offsets, convert without fixed_point")
+        return offsets.astype(np.int32)
+
+    def _metadata(self) -> dict:
+        # Options the file was converted with, scale factors needed to recover real values from
+        # fixed-point columns, and the sorted/unique flags describing the file as written
+        # (readers still check the order of the frames they are given, since attrs are carried
+        # through reordering)
+        metadata = {"conversion": conversion_options(self.dtype, self.fixed_point, self.validate)}
+        if self.fixed_point:
+            metadata.update({"scales": dict(self.scales), "seq_id_base": self.seq_id_base})
+        if self.validate:
+            metadata.update({"sorted": self.validation["sorted"], "unique": self.validation["unique"],
+                             "validation": dict(self.validation)})
+        return metadata
+
+    def _normalise(self, records: np.ndarray) -> np.ndarray:
+        # Count out-of-order, duplicate (same Seq Id) and, for feeds with contiguous Seq Ids,
+        # missing records, then stable sort by (Transaction time, Seq Id) and drop repeated
+        # Seq Ids, only when a check fails.
+        # Chunks are normalised individually; disorder across chunk boundaries is recorded in
+        # the sorted/unique flags but cannot be repaired without holding the whole feed.
+        if not self.validate or len(records) == 0:
+            return records
+        report = self.validation
+        report["records"] += len(records)
+        times, seq_ids = records["Transaction time"], records["Seq Id"]
+        is_out_of_order = (times[1:] < times[:-1]) | ((times[1:] == times[:-1]) & (seq_ids[1:] < seq_ids[:-1]))
+        out_of_order = int(np.count_nonzero(is_out_of_order))
+        if out_of_order:
+            report["out_of_order"] += out_of_order
+            records = records[np.lexsort((seq_ids, times))]
+            times, seq_ids = records["Transaction time"], records["Seq Id"]
+        if (seq_ids[1:] > seq_ids[:-1]).all():
+            unique_seq_ids = seq_ids
+        else:
+            # First occurrence of each Seq Id in time order
+            by_seq_id = np.argsort(seq_ids, kind='stable')
+            sorted_seq_ids = seq_ids[by_seq_id]
+            is_repeat = np.concatenate(([False], sorted_seq_ids[1:] == sorted_seq_ids[:-1]))
+            unique_seq_ids = sorted_seq_ids[~is_repeat]
+            if is_repeat.any():
+                report["duplicates"] += int(np.count_nonzero(is_repeat))
+                records = records[np.sort(by_seq_id[~is_repeat])]
+                times, seq_ids = records["Transaction time"], records["Seq Id"]
+        if self.max_seq_id is not None:
+            # Seq Ids at or below one already written are replays or late packets from an earlier
+            # chunk; only the new ones count towards gaps
+            replayed = int(np.count_nonzero(unique_seq_ids <= self.max_seq_id))
+            if replayed:
+                report["replayed"] += replayed
+                report["unique"] = False
+                unique_seq_ids = unique_seq_ids[replayed:]
+            unique_seq_ids = np.concatenate(([self.max_seq_id], unique_seq_ids))
+            if (times[0], seq_ids[0]) < self.last_key:
+                report["sorted"] = False
+        if self.contiguous_seq_ids:
+            steps = np.diff(unique_seq_ids)
+            gaps = steps[steps > 1]
+            report["sequence_gaps"] += len(gaps)
+            report["missing_records"] += int((gaps - 1).sum())
+        self.last_key = (times[-1], seq_ids[-1])
+        self.max_seq_id = unique_seq_ids[-1]
+        return records
+
+    def _record_count(self):
+        # Records in a buffer or file; unknown for streams
+        if isinstance(self.data, (str, os.PathLike)):
+            return os.path.getsize(self.data) // self.dtype.itemsize
+        if hasattr(self.data, 'read'):
+            return None
+        return len(memoryview(self.data).cast('B')) // self.dtype.itemsize
+
+    @profiled("unpack", rows_out=len)
     def _unpack_to_dataframe(self) -> pd.DataFrame:
-        arr = self._unpack_to_arr()
+        arr = self._normalise(self._unpack_to_arr())
         self.df = pd.DataFrame(
-            arr,
+            self._scale_columns(arr),
             columns = self.column_names,
         )
+        self.df.attrs.update(self._metadata())
         return self.df
-    
+
+    def _iter_records(self):
+        # Yield record-aligned structured arrays of at most chunk_size records
+        if isinstance(self.data, (str, os.PathLike)):
+            if os.path.getsize(self.data) == 0:
+                return
+            records = np.memmap(self.data, dtype=self.dtype, mode='r')
+        elif hasattr(self.data, 'read'):
+            yield from self._read_chunks(self.data)
+            return
+        else:
+            records = np.frombuffer(self.data, dtype=self.dtype)
+        for start in range(0, len(records), self.chunk_size):
+            yield records[start:start + self.chunk_size]
+
+    def _read_chunks(self, stream):
+        # Read a binary stream in chunks, carrying any partial record over to the next read
+        record_size = self.dtype.itemsize
+        chunk_bytes = self.chunk_size * record_size
+        remainder = b''
+        while True:
+            block = stream.read(chunk_bytes - len(remainder))
+            if not block:
+                break
+            buffer = remainder + block
+            n_records = len(buffer) // record_size
+            remainder = buffer[n_records * record_size:]
+            if n_records:
+                yield np.frombuffer(buffer, dtype=self.dtype, count=n_records)
+        if remainder:
+            raise ValueError(f"Feed ends with a partial record of {len(remainder)} bytes")
+
+    def _iter_dataframes(self):
+        # Keep the row index continuous across chunks
+        offset = 0
+        df = None
+        for records in self._iter_records():
+            records = self._normalise(records)
+            index = pd.RangeIndex(offset, offset + len(records))
+            offset += len(records)
+            df = pd.DataFrame(self._scale_columns(records), columns=self.column_names, index=index)
+            df.attrs.update(self._metadata())
+            yield df
+        if df is not None:
+            # The flags are only final once every chunk is seen; write_chunks stores the last chunk's attrs
+            df.attrs.update(self._metadata())
+
+    @profiled("save_hdf5")
     def _save_to_hdfstore(self, path):
-        HDF5Reader.write_data(path, self.df)
+        # Always a table indexed on 'Transaction time', so windowed and column reads skip the rest
+        if self.chunk_size is None:
+            HDF5Reader.write_data(path, self.df, table=True)
+        else:
+            HDF5Reader.write_chunks(path, self._iter_dataframes())
 
 class OrderBookFeedConverter(FeedConverter):
 
-    def __init__(self, data):
-        column_names = ["Received time", "MD entry time", "Transaction time", 
-                        "Seq Id", "Bid qty", "Bid price", "Ask qty", "Ask price"]
-        form = "QQQQqqqq"
-        super().__init__(data, form, column_names)
-
-    def convert(self):
-        return super().convert()
-
-    def _unpack_row(self, fields) -> np.array:
-        # Unpack binary row to array of data
-        received_time = int(fields[0])/10**9
-        md_entry_time = int(fields[1])/10**9
-        transact_time = int(fields[2])/10**9
-        seq_id = int(fields[3])
-        bid_qty = int(fields[4])/10**8
-        bid_prc = int(fields[5])/10**8
-        ask_qty = int(fields[6])/10**8
-        ask_prc = int(fields[7])/10**8
-        return np.array([received_time, md_entry_time, transact_time, seq_id,
-            bid_qty, bid_prc, ask_qty, ask_prc])
-    
-    def _unpack_to_arr(self) -> np.array:
-        super()._unpack_to_arr()
-        return self.data_arr
+    # Binary layout "QQQQqqqq"
+    dtype = np.dtype([("Received time", "Q"), ("MD entry time", "Q"), ("Transaction time", "Q"),
+                      ("Seq Id", "Q"), ("Bid qty", "q"), ("Bid price", "q"),
+                      ("Ask qty", "q"), ("Ask price", "q")])
+    scales = {"Received time": 10**9, "MD entry time": 10**9, "Transaction time": 10**9,
+              "Bid qty": 10**8, "Bid price": 10**8, "Ask qty": 10**8, "Ask price": 10**8}
+
+    def __init__(self, data, chunk_size: int = None, fixed_point: bool = False, validate: bool = True):
+        super().__init__(data, self.dtype, self.scales, chunk_size, fixed_point, validate)
 
     def _save_to_csv(self, path = 'data/sample/order_book.csv'):
         super()._save_to_csv(path)
@@ -77,29 +237,16 @@ class OrderBookFeedConverter(FeedConverter):
 
 class PublicTradeFeedConverter(FeedConverter):
 
-    def __init__(self, data):
-        form = "QQQQqq"
-        column_names = ["Received time", "MD entry time", "Transaction time", 
-                        "Seq Id", "Trade qty", "Trade price"]
-        super().__init__(data, form, column_names)
-
-    def convert(self):
-        return super().convert()
-
-    def _unpack_row(self, fields) -> np.array:
-        # Unpack binary row to array of data
-        received_time = int(fields[0])/10**9
-        md_entry_time = int(fields[1])/10**9
-        transact_time = int(fields[2])/10**9
-        seq_id = int(fields[3])
-        trd_qty = int(fields[4])/10**8
-        trd_prc = int(fields[5])/10**8
-        return np.array([received_time, md_entry_time, transact_time, seq_id,
-                trd_qty, trd_prc])
-
-    def _unpack_to_arr(self) -> np.array:
-        super()._unpack_to_arr()
-        return self.data_arr
+    # Binary layout "QQQQqq"
+    dtype = np.dtype([("Received time", "Q"), ("MD entry time", "Q"), ("Transaction time", "Q"),
+                      ("Seq Id", "Q"), ("Trade qty", "q"), ("Trade price", "q")])
+    scales = {"Received time": 10**9, "MD entry time": 10**9, "Transaction time": 10**9,
+              "Trade qty": 10**8, "Trade price": 10**8}
+    # Trades carry the Seq Id of the book update they belong to, a sparse subset of the sequence
+    contiguous_seq_ids = False
+
+    def __init__(self, data, chunk_size: int = None, fixed_point: bool = False, validate: bool = True):
+        super().__init__(data, self.dtype, self.scales, chunk_size, fixed_point, validate)
 
     def _save_to_csv(self, path = 'data/sample/public_trade.csv'):
         super()._save_to_csv(path)
@@ -107,28 +254,234 @@ class PublicTradeFeedConverter(FeedConverter):
     def _save_to_hdfstore(self, path='data/sample/public_trade.h5'):
         return super()._save_to_hdfstore(path)
 
-if len(sys.argv) == 2 and sys.argv[1] in ['-b', '-t']:
-    data = sys.stdin.buffer.read()
-    if sys.argv[1] == '-b':
-        obf = OrderBookFeedConverter(data)
-        obf._save_to_csv()
+CONVERTERS = {
+    'order_book': OrderBookFeedConverter,
+    'public_trade': PublicTradeFeedConverter,
+}
+
+
+def detect_feed_type(path):
+    # Feed type from the file name (e.g. "ABC_20240102_order_book.feed"), falling back to the
+    # record size when the file length fits exactly one layout
+    basename = os.path.basename(path)
+    for feed_type in CONVERTERS:
+        if feed_type in basename:
+            return feed_type
+    size = os.path.getsize(path)
+    matches = [feed_type for feed_type, converter_cls in CONVERTERS.items()
+               if size and size % converter_cls.dtype.itemsize == 0]
+    return matches[0] if len(matches) == 1 else None
+
+
+def expand_inputs(inputs) -> list:
+    # (feed path, path relative to its input root) for files, directories (searched recursively) and
+    # globs. The root of a glob is its leading non-wildcard directories and the root of explicit
+    # files is their common parent, so same-named files in different directories stay distinct.
+    found = []
+    files = []
+    for name in inputs:
+        if os.path.isdir(name):
+            for root, _, file_names in os.walk(name):
+                for file_name in sorted(file_names):
+                    if file_name.endswith('.feed'):
+                        path = os.path.join(root, file_name)
+                        found.append((path, os.path.relpath(path, name)))
+        elif glob.has_magic(name):
+            root = glob_root(name)
+            found.extend((path, os.path.relpath(path, root)) for path in sorted(glob.glob(name, recursive=True))
+                         if os.path.isfile(path))
+        else:
+            files.append(name)
+    if files:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+        found.extend((path, os.path.relpath(os.path.abspath(path), root)) for path in files)
+    return found
+
+
+def glob_root(pattern):
+    # Leading directories of a glob pattern that contain no wildcards
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def duplicate_outputs(jobs) -> dict:
+    # Output path -> feed paths, for outputs that more than one feed would be converted to
+    feeds = {}
+    for job in jobs:
+        feeds.setdefault(os.path.abspath(job[2]), []).append(job[0])
+    return {path: paths for path, paths in feeds.items() if len(paths) > 1}
+
+
+def output_path(feed_path, relative_path, output_dir=None):
+    # Legacy names keep their data/sample destination unless an output directory is given
+    stem = os.path.splitext(relative_path)[0]
+    if output_dir is not None:
+        return os.path.join(output_dir, stem + '.h5')
+    if os.path.basename(feed_path) in (f"{feed_type}.feed" for feed_type in CONVERTERS):
+        return os.path.join('data/sample', stem + '.h5')
+    return os.path.splitext(feed_path)[0] + '.h5'
+
+
+def conversion_options(dtype, fixed_point, validate) -> dict:
+    # Options that change a converted file; chunk size does not
+    return {"dtype": str(dtype.descr), "fixed_point": bool(fixed_point), "validate": bool(validate)}
+
+
+def is_up_to_date(feed_path, h5_path, options=None):
+    # Output newer than the feed and, when options are given, converted with the same options
+    if not os.path.exists(h5_path) or os.path.getmtime(h5_path) < os.path.getmtime(feed_path):
+        return False
+    if options is None:
+        return True
+    try:
+        return HDF5Reader.read_metadata(h5_path).get("conversion") == options
+    except (OSError, KeyError):
+        return False
+
+
+def convert_file(job) -> dict:
+    # Convert one feed file; the output is written under a temporary name and renamed when
+    # complete, so an interrupted run never leaves an output that looks up to date
+    feed_path, feed_type, h5_path, chunk_size, fixed_point, validate, profile = job
+    converter_cls = CONVERTERS[feed_type]
+    if profile and not StageProfiler.enabled:
+        StageProfiler.enable()
+    first_record = len(StageProfiler.records)
+    start = time.perf_counter()
+    if os.path.dirname(h5_path):
+        os.makedirs(os.path.dirname(h5_path), exist_ok=True)
+    temp_path = h5_path + '.tmp'
+    if chunk_size is None:
+        with open(feed_path, mode='rb') as file:
+            converter = converter_cls(file.read(), fixed_point=fixed_point, validate=validate)
     else:
-        ptf = PublicTradeFeedConverter(data)
-        ptf._save_to_csv()
+        converter = converter_cls(feed_path, chunk_size, fixed_point, validate)
+    converter.convert(temp_path)
+    os.replace(temp_path, h5_path)
+    size = os.path.getsize(feed_path)
+    return {
+        "path": feed_path,
+        "output": h5_path,
+        "records": size // converter_cls.dtype.itemsize,
+        "bytes": size,
+        "seconds": time.perf_counter() - start,
+        "validation": converter.validation if validate else None,
+        "profile": StageProfiler.records[first_record:],
+    }
+
+
+def convert_files(jobs, max_workers=None):
+    # Yield (job, result or exception) as files finish; one failed file does not stop the batch
+    if max_workers == 1:
+        for job in jobs:
+            try:
+                yield job, convert_file(job)
+            except Exception as error:
+                yield job, error
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(convert_file, job): job for job in jobs}
+        for future in as_completed(futures):
+            error = future.exception()
+            yield futures[future], error if error is not None else future.result()
+
+
+def format_throughput(result) -> str:
+    seconds = max(result["seconds"], 1e-9)
+    return (f"{result['path']} -> {result['output']}: {result['records']} records in {seconds:.2f} s "
+            f"({result['records'] / seconds:,.0f} records/s, {result['bytes'] / seconds / 2**20:.1f} MiB/s)"
+            + format_validation(result.get("validation")))
+
+
+def format_validation(report) -> str:
+    # Summary of the integrity issues found, empty for a clean feed
+    if not report:
+        return ""
+    issues = [f"{report[key]} {key.replace('_', ' ')}"
+              for key in ("out_of_order", "duplicates", "replayed", "sequence_gaps", "missing_records") if report[key]]
+    return f" [{', '.join(issues)}]" if issues else ""
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Convert binary .feed files to HDF5 (or CSV from stdin)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('-b', dest='stdin_type', action='store_const', const='order_book',
+                        help="read an order book feed from stdin and write CSV")
+    source.add_argument('-t', dest='stdin_type', action='store_const', const='public_trade',
+                        help="read a public trade feed from stdin and write CSV")
+    parser.add_argument('-c', '--chunk-size', type=int, default=None,
+                        help="stream the feed in chunks of this many records to bound memory use")
+    parser.add_argument('--fixed-point', action='store_true',
+                        help="store raw integer timestamps, prices and quantities instead of floats")
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help="write each FILE to OUTPUT_DIR/<relative path>.h5 (default: next to the feed)")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-f', '--force', action='store_true',
+                        help="convert even when the output is newer than the feed")
+    parser.add_argument('--no-validate', dest='validate', action='store_false',
+                        help="skip the ordering, duplicate and sequence gap checks")
+    parser.add_argument('--profile', default=None, metavar='TRACE',
+                        help="record per-stage timings and write them as a Chrome trace to TRACE")
+    parser.add_argument('files', nargs='*', help=".feed files, directories or glob patterns")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    if args.profile is not None:
+        StageProfiler.enable()
+
+    if args.stdin_type is not None:
+        converter_cls = CONVERTERS[args.stdin_type]
+        if args.chunk_size is None:
+            converter = converter_cls(sys.stdin.buffer.read(), fixed_point=args.fixed_point, validate=args.validate)
+            converter._unpack_to_dataframe()
+        else:
+            converter = converter_cls(sys.stdin.buffer, args.chunk_size, args.fixed_point, args.validate)
+        converter._save_to_csv()
 
-else:
-    for file_name in sys.argv[1:]:
-        basename = os.path.basename(file_name)
+    jobs = []
+    for feed_path, relative_path in expand_inputs(args.files):
+        feed_type = detect_feed_type(feed_path)
+        if feed_type is None:
+            print(f"{feed_path}: unknown feed type, skipped", file=sys.stderr)
+            continue
+        h5_path = output_path(feed_path, relative_path, args.output_dir)
+        jobs.append((feed_path, feed_type, h5_path, args.chunk_size, args.fixed_point, args.validate,
+                     args.profile is not None))
+    duplicates = duplicate_outputs(jobs)
+    if duplicates:
+        for h5_path, feed_paths in duplicates.items():
+            print(f"{h5_path}: would be written by {', '.join(feed_paths)}", file=sys.stderr)
+        return 2
+    for job in [job for job in jobs if not args.force and is_up_to_date(
+            job[0], job[2], conversion_options(CONVERTERS[job[1]].dtype, args.fixed_point, args.validate))]:
+        print(f"{job[0]}: {job[2]} is up to date, skipped")
+        jobs.remove(job)
 
-        rv_md = []
-        md_tr = []
+    failures = 0
+    total_records, start = 0, time.perf_counter()
+    for job, result in convert_files(jobs, args.jobs):
+        if isinstance(result, Exception):
+            failures += 1
+            print(f"{job[0]}: failed: {result}", file=sys.stderr)
+        else:
+            total_records += result["records"]
+            print(format_throughput(result))
+            # Stages recorded in worker processes
+            StageProfiler.records.extend(record for record in result["profile"] if record["pid"] != os.getpid())
+    if len(jobs) > 1:
+        elapsed = time.perf_counter() - start
+        print(f"Converted {len(jobs) - failures}/{len(jobs)} files, {total_records} records in {elapsed:.2f} s")
+    if args.profile is not None:
+        StageProfiler.write_chrome_trace(args.profile)
+    return 1 if failures else 0
 
-        if basename == 'order_book.feed':
-            with open(file_name, mode='rb') as file:
-                obf = OrderBookFeedConverter(file.read())
-                obf.convert()
 
-        elif basename == 'public_trade.feed':
-            with open(file_name, mode='rb') as file:
-                ptf = PublicTradeFeedConverter(file.read())
-                ptf.convert()
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import sys
+import numpy as np
+from feed_converter import OrderBookFeedConverter, PublicTradeFeedConverter
+
+# Per-tick standard deviation of log mid price, and the chance and size of a jump on each tick
+VOLATILITY_REGIMES = {
+    "calm": {"sigma": 0.00002, "jump_probability": 0.0, "jump_sigma": 0.0},
+    "normal": {"sigma": 0.0001, "jump_probability": 0.0, "jump_sigma": 0.0},
+    "volatile": {"sigma": 0.0005, "jump_probability": 0.0, "jump_sigma": 0.0},
+    "jumpy": {"sigma": 0.0001, "jump_probability": 0.0005, "jump_sigma": 0.003},
+}
+
+# Records drawn from each block's generator
+BLOCK_SIZE = 65_536
+
+class FeedGenerator():
+    # Deterministic synthetic order book and public trade feeds in the exact .feed binary
+    # layouts. Records are drawn in fixed-size blocks, each from a generator seeded by the seed and
+    # the block number, so the same arguments give byte-identical files whatever the chunk size,
+    # and memory stays bounded at large sizes (up to ~1e8 records).
+
+    def __init__(self, n_records: int, volatility: str = "normal", seed: int = 0,
+                 start_time: float = 1.7e9, mean_interval: float = 0.001, trade_ratio: float = 0.25,
+                 initial_price: float = 30_000.0, tick_size: float = 0.01, chunk_size: int = 1_000_000):
+        self.n_records = int(n_records)
+        self.regime = VOLATILITY_REGIMES[volatility]
+        self.seed = seed
+        self.start_time = start_time
+        self.mean_interval = mean_interval
+        self.trade_ratio = trade_ratio
+        self.initial_price = initial_price
+        self.tick_size = tick_size
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self):
+        # Yield (order book records, public trade records) structured arrays of chunk_size order
+        # book records, cut from fixed-size blocks so the chunk size does not change the output
+        book_parts, trade_parts, buffered = [], [], 0
+        for book, trades in self.__iter_blocks():
+            book_parts.append(book)
+            trade_parts.append(trades)
+            buffered += len(book)
+            while buffered >= self.chunk_size:
+                book, trades = np.concatenate(book_parts), np.concatenate(trade_parts)
+                # Trades share their order book record's Seq Id
+                cut = np.searchsorted(trades["Seq Id"], book["Seq Id"][self.chunk_size - 1], side='right')
+                yield book[:self.chunk_size], trades[:cut]
+                book_parts, trade_parts = [book[self.chunk_size:]], [trades[cut:]]
+                buffered -= self.chunk_size
+        if buffered:
+            yield np.concatenate(book_parts), np.concatenate(trade_parts)
+
+    def __iter_blocks(self):
+        # Each block of BLOCK_SIZE records draws from its own generator, seeded from the seed and
+        # the block number; only the time, price and Seq Id carry over between blocks
+        time_ns = int(self.start_time * 10**9)
+        log_price = np.log(self.initial_price)
+        seq_id = 1
+        price_scale = OrderBookFeedConverter.scales["Bid price"]
+        qty_scale = OrderBookFeedConverter.scales["Bid qty"]
+        tick = int(round(self.tick_size * price_scale))
+        for block, start in enumerate(range(0, self.n_records, BLOCK_SIZE)):
+            rng = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(block,)))
+            n = min(BLOCK_SIZE, self.n_records - start)
+            intervals = np.maximum(rng.exponential(self.mean_interval * 10**9, n), 1).astype(np.int64)
+            times = time_ns + np.cumsum(intervals)
+            steps = rng.normal(0.0, self.regime["sigma"], n)
+            if self.regime["jump_probability"]:
+                jumps = rng.random(n) < self.regime["jump_probability"]
+                steps[jumps] += rng.normal(0.0, self.regime["jump_sigma"], jumps.sum())
+            log_prices = log_price + np.cumsum(steps)
+            mid = np.exp(log_prices) * price_scale
+            half_spread = rng.integers(1, 4, n) * tick / 2
+            bid = (np.floor((mid - half_spread) / tick) * tick).astype(np.int64)
+            ask = np.maximum((np.ceil((mid + half_spread) / tick) * tick).astype(np.int64), bid + tick)
+
+            book = np.empty(n, dtype=OrderBookFeedConverter.dtype)
+            book["Transaction time"] = times
+            book["MD entry time"] = times + rng.integers(0, 50_000, n)
+            book["Received time"] = book["MD entry time"] + rng.integers(100_000, 1_000_000, n)
+            book["Seq Id"] = np.arange(seq_id, seq_id + n)
+            book["Bid qty"] = (rng.exponential(1.0, n) * qty_scale).astype(np.int64) + 1
+            book["Bid price"] = bid
+            book["Ask qty"] = (rng.exponential(1.0, n) * qty_scale).astype(np.int64) + 1
+            book["Ask price"] = ask
+
+            is_trade = rng.random(n) < self.trade_ratio
+            m = int(is_trade.sum())
+            is_buy = rng.random(m) < 0.5
+            trades = np.empty(m, dtype=PublicTradeFeedConverter.dtype)
+            trades["Transaction time"] = times[is_trade]
+            trades["MD entry time"] = book["MD entry time"][is_trade]
+            trades["Received time"] = book["Received time"][is_trade]
+            trades["Seq Id"] = book["Seq Id"][is_trade]
+            # Buys lift the ask with a positive quantity, sells hit the bid with a negative one
+            qty = (rng.exponential(0.1, m) * qty_scale).astype(np.int64) + 1
+            trades["Trade qty"] = np.where(is_buy, qty, -qty)
+            trades["Trade price"] = np.where(is_buy, ask[is_trade], bid[is_trade])
+
+            time_ns, log_price, seq_id = int(times[-1]), log_prices[-1], seq_id + n
+            yield book, trades
+
+    def write(self, order_book_path, public_trade_path):
+        for path in (order_book_path, public_trade_path):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(order_book_path, 'wb') as book_file, open(public_trade_path, 'wb') as trade_file:
+            for book, trades in self.iter_chunks():
+                book.tofile(book_file)
+                trades.tofile(trade_file)
+
+    def to_bytes(self) -> tuple:
+        # Whole feeds in memory, for small sizes
+        chunks = list(self.iter_chunks())
+        return (b''.join(book.tobytes() for book, _ in chunks),
+                b''.join(trades.tobytes() for _, trades in chunks))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic .feed files")
+    parser.add_argument('-n', '--records', type=float, default=1e6, help="order book records (1e4 to 1e8)")
+    parser.add_argument('-v', '--volatility', choices=sorted(VOLATILITY_REGIMES), default='normal')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-o', '--output-dir', default='data/synthetic')
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    generator = FeedGenerator(args.records, args.volatility, args.seed)
+    generator.write(os.path.join(args.output_dir, 'order_book.feed'),
+                    os.path.join(args.output_dir, 'public_trade.feed'))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
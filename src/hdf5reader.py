@@ -1,18 +1,150 @@
+import warnings
+from contextlib import contextmanager
 import pandas as pd
+from profiler import profiled
+
+TIME_COLUMN = 'Transaction time'
+
+def to_time_units(seconds, time_scale=1):
+    # Convert seconds to 'Transaction time' units (integer ns for fixed-point data); None stays None
+    if seconds is None or time_scale == 1:
+        return seconds
+    return int(round(seconds * time_scale))
+
+@contextmanager
+def natural_name_warnings_ignored():
+    # Column names contain spaces, which PyTables warns about when it creates table columns
+    # and indexes; ignored only around those writes
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='object name is not a valid Python identifier')
+        yield
 
 class HDF5Reader():
     def __init__(self):
         pass
 
     @staticmethod
+    @profiled("hdf5_read", rows_out=len)
     def read_data(path):
         store = pd.HDFStore(path, mode='r')
         df = store.get('df')
+        df.attrs.update(HDF5Reader.__read_metadata(store))
         store.close()
         return df
 
     @staticmethod
-    def write_data(path, df):
-        store = pd.HDFStore(path, 'w')
-        store.put('df', df, data_columns=True)
-        store.close()
\ No newline at end of file
+    def read_metadata(path) -> dict:
+        # Stored DataFrame.attrs without reading any rows
+        with pd.HDFStore(path, mode='r') as store:
+            return HDF5Reader.__read_metadata(store)
+
+    @staticmethod
+    @profiled("hdf5_read_window", rows_out=len)
+    def read_window(path, start_time=None, end_time=None, columns=None):
+        # Rows with start_time <= 'Transaction time' < end_time (in the stored time units), and only
+        # the requested columns. Table-format files use the time index; fixed-format files are read whole.
+        with pd.HDFStore(path, mode='r') as store:
+            if store.get_storer('df').is_table:
+                coordinates = HDF5Reader.__window_coordinates(store, start_time, end_time)
+                df = HDF5Reader.select_coordinates(store, 'df', coordinates, columns)
+            else:
+                df = HDF5Reader.__filter_window(store.get('df'), start_time, end_time, columns)
+            df.attrs.update(HDF5Reader.__read_metadata(store))
+        return df
+
+    @staticmethod
+    def iter_window(path, chunksize=1_000_000, start_time=None, end_time=None, columns=None):
+        # Same selection as read_window, yielded in chunks of at most chunksize rows
+        with pd.HDFStore(path, mode='r') as store:
+            metadata = HDF5Reader.__read_metadata(store)
+            if store.get_storer('df').is_table:
+                coordinates = HDF5Reader.__window_coordinates(store, start_time, end_time)
+                if coordinates is not None and len(coordinates) == 0:
+                    return
+                chunks = store.select('df', where=coordinates, columns=columns, chunksize=chunksize)
+            else:
+                df = HDF5Reader.__filter_window(store.get('df'), start_time, end_time, columns)
+                chunks = (df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize))
+            for chunk in chunks:
+                chunk.attrs.update(metadata)
+                yield chunk
+
+    @staticmethod
+    @profiled("hdf5_write", rows_in=lambda path, df, *args, **kwargs: len(df))
+    def write_data(path, df, table=False, complevel=None, complib=None):
+        # table=True writes a queryable table indexed on 'Transaction time';
+        # complevel (0-9) and complib (e.g. 'blosc', 'zlib') set the compression
+        with pd.HDFStore(path, 'w', complevel=complevel, complib=complib) as store, natural_name_warnings_ignored():
+            if table:
+                store.put('df', df, format='table', data_columns=True, index=False)
+                HDF5Reader.__index_time(store)
+            else:
+                store.put('df', df, data_columns=True)
+            HDF5Reader.__write_metadata(store, df.attrs)
+
+    @staticmethod
+    @profiled("hdf5_write_chunks")
+    def write_chunks(path, chunks, complevel=None, complib=None):
+        # Append DataFrame chunks to an appendable table, indexing once at the end
+        with pd.HDFStore(path, 'w', complevel=complevel, complib=complib) as store, natural_name_warnings_ignored():
+            for df in chunks:
+                store.append('df', df, format='table', data_columns=True, index=False)
+            if 'df' in store:
+                HDF5Reader.__index_time(store)
+                HDF5Reader.__write_metadata(store, df.attrs)
+
+    @staticmethod
+    def __index_time(store):
+        if TIME_COLUMN in store.get_storer('df').data_columns:
+            store.create_table_index('df', columns=[TIME_COLUMN], optlevel=9, kind='full')
+
+    @staticmethod
+    def where_coordinates(store, key, condition, columns: dict, values: dict = None):
+        # Row numbers of a table matching a PyTables condition, found through its indexes.
+        # Column names have spaces, so columns binds condition variables to column names and
+        # values binds the remaining variables.
+        table = store.get_storer(key).table
+        condvars = {name: table.colinstances[column] for name, column in columns.items()}
+        condvars.update(values or {})
+        # Indexed queries do not promise row order; sorted coordinates keep the file's order
+        return table.get_where_list(condition, condvars=condvars, sort=True)
+
+    @staticmethod
+    def select_coordinates(store, key, coordinates, columns=None) -> pd.DataFrame:
+        # Rows at the given coordinates, or every row for None
+        if coordinates is not None and len(coordinates) == 0:
+            # pandas reads every row for an empty coordinate list
+            return store.select(key, start=0, stop=0, columns=columns)
+        return store.select(key, where=coordinates, columns=columns)
+
+    @staticmethod
+    def __window_coordinates(store, start_time, end_time):
+        # Row numbers inside the time window
+        if start_time is None and end_time is None:
+            return None
+        conditions = []
+        if start_time is not None:
+            conditions.append('(t >= start_time)')
+        if end_time is not None:
+            conditions.append('(t < end_time)')
+        return HDF5Reader.where_coordinates(store, 'df', ' & '.join(conditions), {'t': TIME_COLUMN},
+                                            {'start_time': start_time, 'end_time': end_time})
+
+    @staticmethod
+    def __filter_window(df, start_time, end_time, columns):
+        mask = pd.Series(True, index=df.index)
+        if start_time is not None:
+            mask &= df[TIME_COLUMN] >= start_time
+        if end_time is not None:
+            mask &= df[TIME_COLUMN] < end_time
+        return df.loc[mask, columns if columns is not None else df.columns]
+
+    @staticmethod
+    def __write_metadata(store, attrs):
+        # Persist DataFrame.attrs (e.g. fixed-point scales) alongside the 'df' table
+        if attrs:
+            store.get_storer('df').attrs.metadata = dict(attrs)
+
+    @staticmethod
+    def __read_metadata(store):
+        return getattr(store.get_storer('df').attrs, 'metadata', {})
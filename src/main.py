@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+import os
+import argparse
+import hashlib
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from feed_converter import convert_file, detect_feed_type, expand_inputs, format_validation
+from hdf5reader import HDF5Reader, TIME_COLUMN
+from preprocessor import OrderBookPreprocessor
+from event_analyser import EventAnalyser, DoubleEmaAnalyser, EVENT_SIZE_BUCKET_EDGES
+
+PREPROCESSED_COLUMNS = ["Transaction time", "Bid price", "Ask price", "Mid price", "Spread"]
+
+class Stage():
+    # One step of the pipeline: function(inputs, outputs, params) reads the input files and
+    # writes every output file. A stage depends on the stages producing its inputs.
+
+    def __init__(self, name, function, inputs: list, outputs: list, params: dict = None):
+        self.name = name
+        self.function = function
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+
+    def key(self) -> str:
+        # Changes when the function, its parameters or any input file changes
+        parts = [self.function.__name__, self.params, [(path, file_fingerprint(path)) for path in self.inputs]]
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+class Pipeline():
+    # Runs stages in dependency order, independent ones concurrently on a process pool. After
+    # each stage the key it ran with and the fingerprints of its outputs are checkpointed to
+    # a manifest; a stage is skipped while its key is unchanged and its outputs are as it left
+    # them. Stages write their outputs under temporary names and rename them when complete, so
+    # after a crash or a parameter change only the unfinished or affected stages run again.
+
+    def __init__(self, work_dir='output/pipeline', max_workers=None):
+        self.work_dir = work_dir
+        self.max_workers = max_workers
+        self.stages = {}
+        os.makedirs(work_dir, exist_ok=True)
+        self.manifest_path = os.path.join(work_dir, 'manifest.json')
+        self.manifest = self.__load_manifest()
+
+    def add(self, stage: Stage):
+        # Each stage name and output path must be unique, or one stage would silently replace another
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicate stage name {stage.name!r}")
+        outputs = {os.path.abspath(path): other.name for other in self.stages.values() for path in other.outputs}
+        for path in stage.outputs:
+            if os.path.abspath(path) in outputs:
+                raise ValueError(f"{path} is an output of both {outputs[os.path.abspath(path)]!r} and {stage.name!r}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def dependencies(self, stage: Stage) -> list:
+        producers = {output: other.name for other in self.stages.values() for output in other.outputs}
+        return sorted({producers[path] for path in stage.inputs if path in producers})
+
+    def is_current(self, stage: Stage) -> bool:
+        entry = self.manifest.get(stage.name)
+        return (entry is not None and entry["key"] == stage.key()
+                and all(entry["outputs"].get(path) == file_fingerprint(path) for path in stage.outputs))
+
+    def run(self, force: bool = False, report=print) -> dict:
+        # Stage name -> 'skipped', 'ran', 'failed' or 'blocked' (an upstream stage failed)
+        status = {}
+        waiting = {name: set(self.dependencies(stage)) for name, stage in self.stages.items()}
+        executor = ProcessPoolExecutor(max_workers=self.max_workers) if self.max_workers != 1 else None
+        running = {}
+        try:
+            while waiting or running:
+                for name in [name for name, needs in waiting.items() if needs <= status.keys()]:
+                    stage, needs = self.stages[name], waiting.pop(name)
+                    if any(status[need] in ('failed', 'blocked') for need in needs):
+                        status[name] = 'blocked'
+                        report(f"{name}: blocked")
+                    elif not force and self.is_current(stage):
+                        status[name] = 'skipped'
+                        report(f"{name}: up to date")
+                    elif executor is None:
+                        self.__finish(stage, status, self.__run_in_process(stage), report)
+                    else:
+                        running[executor.submit(run_stage, stage.function, stage.inputs, stage.outputs,
+                                                stage.params)] = stage
+                if not running:
+                    if waiting and not any(needs <= status.keys() for needs in waiting.values()):
+                        raise ValueError(f"Stages with unmet or circular dependencies: {sorted(waiting)}")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    error = future.exception()
+                    self.__finish(stage, status, error if error is not None else future.result(), report)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        return status
+
+    @staticmethod
+    def __run_in_process(stage):
+        try:
+            return run_stage(stage.function, stage.inputs, stage.outputs, stage.params)
+        except Exception as error:
+            return error
+
+    def __finish(self, stage, status, result, report):
+        if isinstance(result, Exception):
+            status[stage.name] = 'failed'
+            self.manifest.pop(stage.name, None)
+            report(f"{stage.name}: failed: {result!r}")
+        else:
+            status[stage.name] = 'ran'
+            self.manifest[stage.name] = {
+                "key": stage.key(),
+                "outputs": {path: file_fingerprint(path) for path in stage.outputs},
+                "seconds": result["seconds"],
+                "finished": time.time(),
+            }
+            report(f"{stage.name}: done in {result['seconds']:.2f} s{result.get('summary', '')}")
+        self.__save_manifest()
+
+    def __load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as file:
+            return json.load(file)
+
+    def __save_manifest(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.manifest, file, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+
+def file_fingerprint(path):
+    # Size and modification time; None for a missing file
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def run_stage(function, inputs, outputs, params) -> dict:
+    for path in outputs:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+    start = time.perf_counter()
+    summary = function(inputs, outputs, params)
+    return {"seconds": time.perf_counter() - start, "summary": summary or ""}
+
+
+def temporary_path(path):
+    # Keeps the extension, which some writers use to pick the format
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.tmp{extension}"
+
+
+def convert_stage(inputs, outputs, params):
+    result = convert_file((inputs[0], params["feed_type"], outputs[0], params["chunk_size"],
+                           params["fixed_point"], True, False))
+    return f", {result['records']} records" + format_validation(result["validation"])
+
+
+def validate_stage(inputs, outputs, params):
+    # Integrity report from the conversion, or checked here for files converted without it
+    df = HDF5Reader.read_window(inputs[0], columns=[TIME_COLUMN])
+    metadata, times = df.attrs, df[TIME_COLUMN].to_numpy()
+    if len(times) == 0:
+        raise ValueError(f"{inputs[0]} has no records")
+    report = {"rows": len(times), "sorted": metadata.get("sorted"), "unique": metadata.get("unique"),
+              "validation": metadata.get("validation")}
+    if report["sorted"] is None:
+        report["sorted"] = bool((times[1:] >= times[:-1]).all())
+    if not report["sorted"] and params["require_sorted"]:
+        raise ValueError(f"{inputs[0]} is not in 'Transaction time' order")
+    with open(temporary_path(outputs[0]), 'w') as file:
+        json.dump(report, file, indent=1, default=int)
+    os.replace(temporary_path(outputs[0]), outputs[0])
+    return f", {report['rows']} rows, sorted: {report['sorted']}"
+
+
+def preprocess_stage(inputs, outputs, params):
+    # Order book with the derived mid price and spread, written once for every later stage
+    df = OrderBookPreprocessor(inputs[0]).select(PREPROCESSED_COLUMNS)
+    HDF5Reader.write_data(temporary_path(outputs[0]), df, table=True)
+    os.replace(temporary_path(outputs[0]), outputs[0])
+
+
+def analyse_stage(inputs, outputs, params):
+    # One event per time bin, with its direction, end time and price and size bucket
+    analyser = EventAnalyser(OrderBookPreprocessor(inputs[0]), None, params["bucket_edges"])
+    events = analyser.analyse(save=False, bucket_size=params["bucket_size"])
+    HDF5Reader.write_data(temporary_path(outputs[0]), events)
+    os.replace(temporary_path(outputs[0]), outputs[0])
+    return f", {len(events)} bins"
+
+
+def crossover_stage(inputs, outputs, params):
+    # Events between consecutive crossovers of the short and long mid price EMAs
+    events = DoubleEmaAnalyser(OrderBookPreprocessor(inputs[0]), None, *params["halflives"]).get_events()
+    HDF5Reader.write_data(temporary_path(outputs[0]), events)
+    os.replace(temporary_path(outputs[0]), outputs[0])
+    return f", {len(events)} events"
+
+
+def export_stage(inputs, outputs, params):
+    # P0, P1 and P2 of each event at one delay
+    analyser = EventAnalyser(OrderBookPreprocessor(inputs[0]), None, params["bucket_edges"])
+    analyser.binned_data = HDF5Reader.read_data(inputs[1])
+    selection = analyser.save_events(temporary_path(outputs[0]), [params["time_delay"]])
+    os.replace(temporary_path(outputs[0]), outputs[0])
+    return f", {len(selection)} events"
+
+
+def build_pipeline(feeds: list, args) -> Pipeline:
+    # convert -> validate for every feed; for order book feeds also preprocess, then analyse ->
+    # export (one stage per delay) and crossovers. Stages are named after the feed's path relative
+    # to its input root, without the extension, and write to <work_dir>/<that path>/.
+    pipeline = Pipeline(args.work_dir, args.jobs)
+    for feed_path, relative_path, feed_type in feeds:
+        name = os.path.splitext(relative_path)[0].replace(os.sep, '/')
+        out = os.path.join(args.work_dir, *name.split('/'))
+        h5_path = os.path.join(out, f"{feed_type}.h5")
+        validation_path = os.path.join(out, "validation.json")
+        pipeline.add(Stage(f"{name}/convert", convert_stage, [feed_path], [h5_path],
+                           {"feed_type": feed_type, "chunk_size": args.chunk_size, "fixed_point": args.fixed_point}))
+        pipeline.add(Stage(f"{name}/validate", validate_stage, [h5_path], [validation_path],
+                           {"require_sorted": args.require_sorted}))
+        if feed_type != 'order_book':
+            continue
+        preprocessed_path = os.path.join(out, "preprocessed.h5")
+        events_path = os.path.join(out, "events.h5")
+        crossovers_path = os.path.join(out, "crossover_events.h5")
+        analysis = {"bucket_size": args.bucket_size, "bucket_edges": args.bucket_edges}
+        pipeline.add(Stage(f"{name}/preprocess", preprocess_stage, [h5_path, validation_path], [preprocessed_path]))
+        pipeline.add(Stage(f"{name}/analyse", analyse_stage, [preprocessed_path], [events_path], analysis))
+        pipeline.add(Stage(f"{name}/crossovers", crossover_stage, [preprocessed_path], [crossovers_path],
+                           {"halflives": args.halflives}))
+        for time_delay in args.delays:
+            export_path = os.path.join(out, f"events_{time_delay * 1000:g}ms.{args.format}")
+            pipeline.add(Stage(f"{name}/export {time_delay * 1000:g} ms", export_stage,
+                               [preprocessed_path, events_path], [export_path],
+                               {**analysis, "time_delay": time_delay}))
+    return pipeline
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Convert, validate, preprocess, analyse and export feeds, "
+                                                 "re-running only the stages whose inputs or parameters changed")
+    parser.add_argument('feeds', nargs='+', help=".feed files, directories (searched recursively) or glob patterns")
+    parser.add_argument('-w', '--work-dir', default='output/pipeline',
+                        help="directory for stage outputs and the checkpoint manifest")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument('-f', '--force', action='store_true', help="run every stage even if up to date")
+    parser.add_argument('-c', '--chunk-size', type=int, default=None,
+                        help="stream conversion in chunks of this many records")
+    parser.add_argument('--fixed-point', action='store_true', help="store prices and times as scaled integers")
+    parser.add_argument('--require-sorted', action='store_true',
+                        help="fail validation for feeds that are not in time order after conversion")
+    parser.add_argument('-b', '--bucket-size', type=float, default=0.1)
+    parser.add_argument('--bucket-edges', type=float, nargs='+', default=list(EVENT_SIZE_BUCKET_EDGES))
+    parser.add_argument('--halflives', type=float, nargs=2, default=[0.001, 0.008], metavar=('SHORT', 'LONG'))
+    parser.add_argument('-d', '--delays', type=float, nargs='+', default=[0.1, 0.2, 0.5, 1.0])
+    parser.add_argument('--format', choices=['xlsx', 'parquet', 'feather', 'h5'], default='h5',
+                        help="event export format; xlsx is capped at ~1M rows and slow, so only for small outputs")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    feeds = []
+    for feed_path, relative_path in expand_inputs(args.feeds):
+        feed_type = detect_feed_type(feed_path) if os.path.isfile(feed_path) else None
+        if feed_type is None:
+            print(f"{feed_path}: unknown feed type, skipped", file=sys.stderr)
+            continue
+        feeds.append((os.path.abspath(feed_path), relative_path, feed_type))
+    if not feeds:
+        print("No feeds to process", file=sys.stderr)
+        return 1
+    try:
+        pipeline = build_pipeline(feeds, args)
+    except ValueError as error:
+        print(f"Cannot build the pipeline: {error}", file=sys.stderr)
+        return 2
+    status = pipeline.run(args.force)
+    counts = {outcome: sum(1 for value in status.values() if value == outcome)
+              for outcome in ('ran', 'skipped', 'failed', 'blocked')}
+    print(", ".join(f"{count} {outcome}" for outcome, count in counts.items() if count))
+    return 1 if counts['failed'] or counts['blocked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,79 @@
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from event_analyser import DoubleEmaAnalyser
+from ema_kernel import EmaKernel
+from preprocessor import OrderBookPreprocessor
+
+class ParameterSweep():
+    # Runs the DoubleEmaAnalyser event pipeline over a grid of (halflife_short, halflife_long)
+    # pairs and filter_events parameters. The time and mid price arrays are placed in shared
+    # memory once and read by every worker; the input DataFrame is never modified.
+
+    def __init__(self, order_book: pd.DataFrame):
+        preprocessor = OrderBookPreprocessor(order_book)
+        self.time_scale = preprocessor.scale("Transaction time")
+        self.times = preprocessor.column("Transaction time")
+        self.mid_price = preprocessor.get_mid_price()
+
+    def run(self, halflife_pairs: list, filter_params: list = ({"max_time": 1.0, "min_price_std": 1.0},),
+            max_workers: int = None) -> pd.DataFrame:
+        arrays = {"times": self.times, "mid_price": self.mid_price}
+        blocks = {name: self.__to_shared_memory(arr) for name, arr in arrays.items()}
+        specs = {name: (blocks[name].name, arr.dtype.str, arr.shape) for name, arr in arrays.items()}
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_attach_arrays,
+                                     initargs=(specs, self.time_scale)) as executor:
+                jobs = [(hl_short, hl_long, list(filter_params)) for hl_short, hl_long in halflife_pairs]
+                rows = list(itertools.chain.from_iterable(executor.map(_evaluate, jobs)))
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def halflife_grid(halflives_short: list, halflives_long: list) -> list:
+        return [(short, long) for short, long in itertools.product(halflives_short, halflives_long) if short < long]
+
+    @staticmethod
+    def __to_shared_memory(arr):
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[:] = arr
+        return block
+
+
+# Per-worker state, set once by the pool initializer
+_worker = {}
+
+def _attach_arrays(specs, time_scale):
+    _worker["blocks"] = []
+    for name, (block_name, dtype, shape) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker["blocks"].append(block)
+        _worker[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    _worker["time_scale"] = time_scale
+
+
+def _evaluate(job) -> list:
+    hl_short, hl_long, filter_params = job
+    times, mid_price, time_scale = _worker["times"], _worker["mid_price"], _worker["time_scale"]
+    ema = EmaKernel(times, mid_price, [hl_short, hl_long], time_scale).mean()
+    idx_ups, idx_downs = DoubleEmaAnalyser.get_ema_intersection_points(ema[:, 0], ema[:, 1])
+    events = DoubleEmaAnalyser.events_from_crossovers(times, mid_price, idx_ups, idx_downs, time_scale)
+    rows = []
+    for params in filter_params:
+        filtered = DoubleEmaAnalyser.filter_events(events, **params)
+        rows.append({
+            "Halflife short": hl_short,
+            "Halflife long": hl_long,
+            **{name.replace("_", " ").capitalize(): value for name, value in params.items()},
+            "Events": len(events),
+            "Filtered events": len(filtered),
+            "Mean relative price change": filtered["Relative price change"].mean(),
+            "Std relative price change": filtered["Relative price change"].std(),
+            "Mean duration": filtered["Duration"].mean(),
+        })
+    return rows
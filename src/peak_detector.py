@@ -0,0 +1,200 @@
+import math
+from collections import deque
+import numpy as np
+
+class StreamingPeakDetector():
+    # One forward pass over a series (e.g. EMA variance), reporting each peak with its P0/P2
+    # boundaries as soon as the series has settled after it. The height threshold is an
+    # exponentially weighted mean + n_std * std of the values seen so far, in place of the
+    # whole-series mean and std, and boundaries follow scipy.signal.peak_widths: the
+    # interpolated crossings of peak - rel_height * prominence either side of the peak.
+    # The peak and the bases either side of it are tracked as scalars. Samples leaving the
+    # `window` buffer are kept only while they can still be a boundary, so boundaries stay exact
+    # when an excursion lasts longer than `window`; memory is `window` samples plus those, which
+    # are few unless the series keeps rising or falling for longer than `window`.
+
+    def __init__(self, n_std=2.0, threshold_halflife=10_000, rel_height=0.99,
+                 lookahead=1_000, window=20_000, warmup=100):
+        self.n_std = n_std
+        self.decay = 0.5 ** (1.0 / threshold_halflife)
+        self.rel_height = rel_height
+        self.lookahead = lookahead
+        self.warmup = warmup
+        self.buffer = deque(maxlen=window)
+        self.count = 0
+        self.previous_value = None
+        self.ew_weight = 0.0
+        self.ew_mean = 0.0
+        self.ew_squares = 0.0
+        self.peak = None
+        self.peak_threshold = None
+        self.right_base = None
+        self.last_peak_idx = -1
+        # Lowest value since the previous peak, and its value when the current peak was set
+        self.left_min = math.inf
+        self.left_base = None
+        # (idx, value, next value) of evicted samples lower than every sample after them, before
+        # and after the current peak
+        self.evicted = []
+        self.evicted_after_peak = []
+        # (idx, value, previous value) of each new low after the current peak
+        self.lows = []
+
+    def threshold(self):
+        variance = self.ew_squares / self.ew_weight if self.ew_weight else 0.0
+        return self.ew_mean + self.n_std * math.sqrt(variance)
+
+    def __update_threshold(self, value):
+        # Exponentially weighted mean and variance, updated incrementally
+        self.ew_weight = self.decay * self.ew_weight + 1.0
+        delta = value - self.ew_mean
+        self.ew_mean += delta / self.ew_weight
+        self.ew_squares = self.decay * self.ew_squares + delta * (value - self.ew_mean)
+
+    def update(self, value) -> list:
+        idx = self.count
+        self.count += 1
+        if math.isnan(value):
+            return []
+        if len(self.buffer) == self.buffer.maxlen:
+            self.__evict(value)
+        self.buffer.append((idx, value))
+        self.left_min = min(self.left_min, value)
+        peaks = []
+        threshold = self.threshold()
+        is_above = idx >= self.warmup and value >= threshold
+        if self.peak is None:
+            if is_above:
+                self.__start_peak(idx, value, threshold)
+        elif self.right_base is None:
+            if value > self.peak[1]:
+                self.__raise_peak(idx, value)
+            else:
+                self.__record_low(idx, value)
+                if value < self.peak_threshold:
+                    self.right_base = value
+        else:
+            self.__record_low(idx, value)
+            self.right_base = min(self.right_base, value)
+            if is_above or idx - self.peak[0] >= self.lookahead:
+                peaks.append(self.__finalise())
+                if is_above:
+                    self.__start_peak(idx, value, threshold)
+        self.previous_value = value
+        self.__update_threshold(value)
+        return peaks
+
+    def __start_peak(self, idx, value, threshold):
+        self.peak, self.peak_threshold, self.left_base = (idx, value), threshold, self.left_min
+
+    def __raise_peak(self, idx, value):
+        # Samples evicted since the old peak are now before the peak
+        self.peak, self.left_base, self.lows = (idx, value), self.left_min, []
+        for sample in self.evicted_after_peak:
+            self.__push_low(self.evicted, sample)
+        self.evicted_after_peak = []
+
+    def __record_low(self, idx, value):
+        # Walking right from the peak, the first sample below any height is a new low
+        if value < (self.lows[-1][1] if self.lows else self.peak[1]):
+            self.lows.append((idx, value, self.previous_value))
+
+    def __evict(self, value):
+        # Walking left from a peak, the first sample below any height is lower than every sample
+        # after it, so only those are kept of the samples leaving the buffer
+        idx, evicted_value = self.buffer[0]
+        if idx <= self.last_peak_idx:
+            return
+        next_value = self.buffer[1][1] if len(self.buffer) > 1 else value
+        after_peak = self.peak is not None and idx >= self.peak[0]
+        self.__push_low(self.evicted_after_peak if after_peak else self.evicted, (idx, evicted_value, next_value))
+
+    @staticmethod
+    def __push_low(stack, sample):
+        while stack and stack[-1][1] >= sample[1]:
+            stack.pop()
+        stack.append(sample)
+
+    def update_many(self, values) -> list:
+        peaks = []
+        for value in np.asarray(values, dtype=float).tolist():
+            peaks.extend(self.update(value))
+        return peaks
+
+    def flush(self) -> list:
+        peaks = []
+        if self.peak is not None:
+            if self.right_base is None:
+                self.right_base = self.buffer[-1][1]
+            peaks.append(self.__finalise())
+        return peaks
+
+    def __finalise(self) -> dict:
+        peak_idx, peak_value = self.peak
+        prominence = peak_value - max(self.left_base, self.right_base)
+        height = peak_value - self.rel_height * prominence
+        # Walk out from the peak: back to the previous peak on the left, to the newest sample on the right
+        left_ip = self.__crossing(self.__left_samples(), height, -1)
+        right_ip = self.__crossing([(peak_idx, peak_value, peak_value)] + self.lows, height, 1)
+        threshold = self.peak_threshold
+        self.last_peak_idx = peak_idx
+        # Every sample after the peak is at or above right_base
+        self.left_min = self.right_base
+        self.evicted = [sample for sample in self.evicted_after_peak if sample[0] > peak_idx]
+        self.evicted_after_peak, self.lows = [], []
+        self.peak, self.peak_threshold, self.right_base, self.left_base = None, None, None, None
+        return {
+            "Peak idx": peak_idx,
+            "Peak value": peak_value,
+            "Threshold": threshold,
+            "Width height": height,
+            "P0 idx": left_ip,
+            "P2 idx": right_ip,
+            "Width": right_ip - left_ip,
+        }
+
+    def __left_samples(self):
+        # (idx, value, value of the sample towards the peak) from the peak back to the previous
+        # peak: the buffered samples, then those kept from before the buffer
+        peak_idx, neighbour = self.peak
+        yield peak_idx, neighbour, neighbour
+        for idx, value in reversed(self.buffer):
+            if idx >= peak_idx:
+                continue
+            if idx <= self.last_peak_idx:
+                return
+            yield idx, value, neighbour
+            neighbour = value
+        yield from reversed(self.evicted)
+
+    @staticmethod
+    def __crossing(samples, height, step):
+        # Interpolated index where the series first drops to height, walking away from the peak;
+        # samples starts at the peak and runs in the walking direction, each with the value of
+        # the sample before it in that direction
+        for idx, value, neighbour in samples:
+            if value < height:
+                return idx - step * (height - value) / (neighbour - value)
+            if value == height:
+                return float(idx)
+        return float(idx)
+
+
+def detect_peaks(chunks, **detector_params) -> tuple:
+    # Batch wrapper: feed an iterable of array chunks through one detector, carrying state across
+    # chunk boundaries. Returns (peaks, thresholds, (widths, width_heights, left_ips, right_ips)),
+    # the same layout as EmaVarianceAnalyser.variance_peaks.
+    detector = StreamingPeakDetector(**detector_params)
+    found = []
+    for chunk in chunks:
+        found.extend(detector.update_many(chunk))
+    found.extend(detector.flush())
+    def column(name, dtype=float):
+        return np.array([peak[name] for peak in found], dtype=dtype)
+    peak_widths = (column("Width"), column("Width height"), column("P0 idx"), column("P2 idx"))
+    return column("Peak idx", int), column("Threshold"), peak_widths
+
+
+def iter_chunks(values, chunk_size=100_000):
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
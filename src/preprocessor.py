@@ -1,21 +1,149 @@
+import os
+import numpy as np
+import pandas as pd
 from hdf5reader import HDF5Reader
+from binner import TimeBinner
+from ema_kernel import EmaKernel
+
+def mid_price(bid_price, ask_price, price_scale=1):
+    # Mid of bid and ask prices (arrays or scalars), in real units for fixed-point prices
+    return 0.5 * (bid_price + ask_price) / price_scale
+
 
 class Preprocessor():
+    # Lazy, non-mutating view over a feed (a DataFrame or an .h5 path). Derived columns are
+    # declared with the source columns they need and computed on first request; each is then
+    # kept and shared by every consumer of the same preprocessor. The source DataFrame is never
+    # modified, and an .h5 source only has the source columns that requests depend on read.
 
-    def __init__(self, df):
-        self.df = df
+    # name -> (columns it is computed from, method computing it)
+    derived = {
+        "Transaction UTC": (("Transaction time",), "_transaction_utc"),
+    }
 
-    def bucket_data(self, size):
-        pass
+    def __init__(self, source):
+        self.path = None
+        self.df = None
+        if isinstance(source, (str, os.PathLike)):
+            self.path = source
+            self.index = None
+            self.attrs = {}
+        else:
+            self.df = source
+            self.index = source.index
+            self.attrs = dict(source.attrs)
+        self.materialised = {}
 
-    def get_mid_price():
-        pass
+    def scale(self, column_name):
+        # Fixed-point data carries its scale factors in DataFrame.attrs
+        return self.attrs.get("scales", {}).get(column_name, 1)
 
+    def source_columns(self, names) -> list:
+        # Source columns the requested (possibly derived) columns depend on
+        needed = []
+        for name in names:
+            if name in self.derived:
+                dependencies, _ = self.derived[name]
+                needed.extend(column for column in self.source_columns(dependencies) if column not in needed)
+            elif name not in needed:
+                needed.append(name)
+        return needed
 
-class OrderBookPreprocessor(Preprocessor):
+    def column(self, name) -> np.ndarray:
+        if name not in self.materialised:
+            if name in self.derived:
+                dependencies, method = self.derived[name]
+                self.__load(self.source_columns(dependencies))
+                self.materialised[name] = getattr(self, method)()
+            else:
+                self.__load([name])
+        return self.materialised[name]
+
+    def select(self, names) -> pd.DataFrame:
+        # New frame of the requested columns; arrays are shared, not copied
+        self.__load([name for name in self.source_columns(names) if name not in self.materialised])
+        df = pd.DataFrame({name: self.column(name) for name in names}, index=self.index, copy=False)
+        df.attrs.update(self.attrs)
+        return df
+
+    def materialise(self, key, compute):
+        # Parameterised intermediates (time bins, EMAs) are cached under their key
+        if key not in self.materialised:
+            self.materialised[key] = compute()
+        return self.materialised[key]
 
-    def __init__(self, df):
-        super().__init__(df)
+    def __load(self, names):
+        names = [name for name in names if name not in self.materialised]
+        if not names:
+            return
+        if self.path is None:
+            for name in names:
+                self.materialised[name] = self.df[name].to_numpy()
+            return
+        # One read for every missing source column
+        df = HDF5Reader.read_window(self.path, columns=names)
+        if self.index is None:
+            self.index = df.index
+            self.attrs = dict(df.attrs)
+        for name in names:
+            self.materialised[name] = df[name].to_numpy()
+
+    def __len__(self):
+        if self.index is None:
+            self.column("Transaction time")
+        return len(self.index)
+
+    def _transaction_utc(self):
+        # Vectorised epoch to datetime64; fixed-point nanoseconds convert exactly
+        times = self.column("Transaction time")
+        scale = self.scale("Transaction time")
+        if scale != 10**9:
+            times = np.round(times * (10**9 / scale))
+        return times.astype(np.int64).view('datetime64[ns]')
 
     def bucket_data(self, size):
-        pass
\ No newline at end of file
+        # Time bin number of each row, counted from the first row as in EventAnalyser.bin_data
+        def compute():
+            times = self.column("Transaction time")
+            return TimeBinner.bin_numbers(times, times[0], size, self.scale("Transaction time"))
+        return self.materialise(("Time bin", size), compute)
+
+
+class OrderBookPreprocessor(Preprocessor):
+
+    derived = {
+        **Preprocessor.derived,
+        "Mid price": (("Bid price", "Ask price"), "_mid_price"),
+        "Spread": (("Bid price", "Ask price"), "_spread"),
+    }
+
+    def get_mid_price(self):
+        return self.column("Mid price")
+
+    def _mid_price(self):
+        return mid_price(self.column("Bid price"), self.column("Ask price"), self.scale("Bid price"))
+
+    def _spread(self):
+        return (self.column("Ask price") - self.column("Bid price")) / self.scale("Ask price")
+
+    def ema_kernel(self, halflives: list):
+        return EmaKernel(self.column("Transaction time"), self.column("Mid price"), halflives,
+                         self.scale("Transaction time"))
+
+    def ema(self, halflives: list) -> np.ndarray:
+        # Time-decayed EMAs of the mid price, one column per halflife
+        return self.materialise(("EMA", tuple(halflives)), lambda: self.ema_kernel(halflives).mean())
+
+    def ema_variance(self, halflife) -> np.ndarray:
+        return self.materialise(("EMA variance", halflife), lambda: self.ema_kernel([halflife]).var()[:, 0])
+
+
+class PublicTradePreprocessor(Preprocessor):
+
+    derived = {
+        **Preprocessor.derived,
+        "Trade volume": (("Trade qty",), "_trade_volume"),
+    }
+
+    def _trade_volume(self):
+        return np.abs(self.column("Trade qty")) / self.scale("Trade qty")
@@ -0,0 +1,132 @@
+import os
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+
+class StageProfiler():
+    # Opt-in per-stage instrumentation: wall time, CPU time, rows in/out and (optionally) peak
+    # traced allocation for each stage, written as structured JSON or a Chrome trace
+    # (chrome://tracing, Perfetto). Disabled by default, when a stage costs one attribute check.
+
+    enabled = False
+    trace_memory = False
+    records = []
+    _local = threading.local()
+
+    @classmethod
+    def enable(cls, trace_memory: bool = False):
+        cls.enabled = True
+        cls.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def disable(cls):
+        if cls.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        cls.enabled = False
+        cls.trace_memory = False
+
+    @classmethod
+    def reset(cls):
+        cls.records = []
+
+    @classmethod
+    def stage(cls, name, rows_in=None):
+        # Context manager around a block; set record["rows_out"] inside it if known
+        if not cls.enabled:
+            return nullcontext({})
+        return _Stage(cls, name, rows_in)
+
+    @classmethod
+    def write_json(cls, path):
+        with open(path, 'w') as file:
+            json.dump(cls.records, file, indent=1)
+
+    @classmethod
+    def write_chrome_trace(cls, path):
+        events = [{
+            "name": record["stage"],
+            "ph": "X",
+            "ts": record["start_us"],
+            "dur": record["wall_s"] * 10**6,
+            "pid": record["pid"],
+            "tid": record["thread"],
+            "args": {key: value for key, value in record.items()
+                     if key in ("rows_in", "rows_out", "cpu_s", "peak_bytes") and value is not None},
+        } for record in cls.records]
+        with open(path, 'w') as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    @classmethod
+    def _stack(cls) -> list:
+        if not hasattr(cls._local, 'stack'):
+            cls._local.stack = []
+        return cls._local.stack
+
+
+class _Stage():
+
+    def __init__(self, profiler, name, rows_in):
+        self.profiler = profiler
+        self.record = {"stage": name, "rows_in": rows_in, "rows_out": None}
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        self.record["depth"] = len(stack)
+        if self.profiler.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Keep the enclosing stage's peak so far before resetting for this one
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory, self.peak = current, current
+        stack.append(self)
+        self.record["start_us"] = time.time_ns() / 1000
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        stack = self.profiler._stack()
+        stack.pop()
+        peak_bytes = None
+        if self.profiler.trace_memory and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = self.peak - self.start_memory
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        self.record.update({"wall_s": wall, "cpu_s": cpu, "peak_bytes": peak_bytes,
+                            "pid": os.getpid(), "thread": threading.get_ident()})
+        self.profiler.records.append(self.record)
+        return False
+
+
+def profiled(name, rows_in=None, rows_out=None):
+    # Decorator form of StageProfiler.stage. rows_in is called with the function's arguments and
+    # rows_out with its result, both only while profiling is enabled.
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not StageProfiler.enabled:
+                return function(*args, **kwargs)
+            with StageProfiler.stage(name, _count(rows_in, *args, **kwargs)) as record:
+                result = function(*args, **kwargs)
+                record["rows_out"] = _count(rows_out, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def _count(counter, *args, **kwargs):
+    if counter is None:
+        return None
+    try:
+        return int(counter(*args, **kwargs))
+    except (TypeError, AttributeError, KeyError, IndexError):
+        return None
@@ -0,0 +1,111 @@
+import os
+import json
+import pickle
+import hashlib
+from collections import OrderedDict
+import pandas as pd
+
+class ResultCache():
+    # Derived artifacts (mid price, binned tables, EMAs, event tables) keyed by a hash of the
+    # input data and the parameters that produced them. Recent results are kept in memory with
+    # LRU eviction and every result is also written to cache_dir, so a later session can reuse it.
+    # Keys include the content hash of the source file, so editing the .h5 invalidates its entries.
+
+    def __init__(self, cache_dir='output/cache', max_items=32, max_disk_bytes=2**30):
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self.sources_path = os.path.join(cache_dir, 'sources.json')
+        self.sources = self.__load_sources()
+
+    @staticmethod
+    def key(*parts) -> str:
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def get_or_compute(self, parts: tuple, compute):
+        key = self.key(*parts)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return self.memory[key]
+        path = os.path.join(self.cache_dir, key + '.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(path)
+            self.hits += 1
+        else:
+            value = compute()
+            self.__write(path, value)
+            self.misses += 1
+        self.__remember(key, value)
+        return value
+
+    def __remember(self, key, value):
+        self.memory[key] = value
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def __write(self, path, value):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        self.__prune()
+
+    def __prune(self):
+        # Drop the least recently used files once the directory is over max_disk_bytes
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.pkl')]
+        total = sum(entry.stat().st_size for entry in entries)
+        for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+            if total <= self.max_disk_bytes:
+                break
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def clear(self):
+        self.memory.clear()
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.pkl'):
+                os.remove(entry.path)
+
+    def source_hash(self, path) -> str:
+        # Content hash of a file, recomputed only when its size or modification time changes
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        known = self.sources.get(path)
+        if known is not None and known["fingerprint"] == fingerprint:
+            return known["hash"]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(2**24), b''):
+                digest.update(block)
+        self.sources[path] = {"fingerprint": fingerprint, "hash": digest.hexdigest()}
+        self.__save_sources()
+        return self.sources[path]["hash"]
+
+    @staticmethod
+    def frame_hash(df: pd.DataFrame, columns: list = None) -> str:
+        # Content hash of in-memory data that has no source file
+        data = df if columns is None else df[columns]
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(repr(list(data.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        return digest.hexdigest()
+
+    def __load_sources(self) -> dict:
+        if not os.path.exists(self.sources_path):
+            return {}
+        with open(self.sources_path) as file:
+            return json.load(file)
+
+    def __save_sources(self):
+        temp_path = self.sources_path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump(self.sources, file)
+        os.replace(temp_path, self.sources_path)
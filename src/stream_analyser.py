@@ -0,0 +1,236 @@
+import heapq
+import math
+from bisect import bisect_right
+from event_analyser import EVENT_SIZE_BUCKET_EDGES, EMA_TIE_TOLERANCE
+from hdf5reader import to_time_units
+from preprocessor import mid_price
+
+class StreamingAnalyser():
+    # Consumes order book ticks in time order and emits events as soon as they are final.
+    # Times are in 'Transaction time' units; time_scale converts seconds to those units
+    # (10**9 for fixed-point data) and price_scale converts fixed-point prices to floats.
+
+    def __init__(self, time_scale=1, price_scale=1):
+        self.time_scale = time_scale
+        self.price_scale = price_scale
+        self.tick_count = 0
+        self.last_time = None
+
+    def update(self, transaction_time, bid_price, ask_price) -> list:
+        if self.last_time is not None and transaction_time < self.last_time:
+            raise ValueError("Order book ticks must arrive in 'Transaction time' order")
+        events = self._on_tick(transaction_time, mid_price(bid_price, ask_price, self.price_scale))
+        self.last_time = transaction_time
+        self.tick_count += 1
+        return events
+
+    def update_frame(self, df) -> list:
+        # Feed a batch of ticks, e.g. a chunk decoded by OrderBookFeedConverter
+        events = []
+        for row in zip(df["Transaction time"].tolist(), df["Bid price"].tolist(), df["Ask price"].tolist()):
+            events.extend(self.update(*row))
+        return events
+
+    def flush(self) -> list:
+        # Finalise whatever is still open at the end of the feed
+        return []
+
+    def _on_tick(self, transaction_time, mid_price) -> list:
+        return []
+
+
+class StreamingEventAnalyser(StreamingAnalyser):
+    # Online counterpart of EventAnalyser: one event per time bin, with P2 at each delay.
+
+    def __init__(self, bucket_size=0.1, time_delays=(0.1, 0.2, 0.5, 1.0),
+                 bucket_edges=EVENT_SIZE_BUCKET_EDGES, time_scale=1, price_scale=1):
+        super().__init__(time_scale, price_scale)
+        self.bucket_size = bucket_size
+        self.bucket_units = to_time_units(bucket_size, self.time_scale)
+        self.time_delays = list(time_delays)
+        self.delay_units = [to_time_units(time_delay, self.time_scale) for time_delay in self.time_delays]
+        self.bucket_edges = list(bucket_edges)
+        self.zero_bucket = bisect_right(self.bucket_edges, 0)
+        self.init_time = None
+        self.current_bin = None
+        # Price of the first tick at the latest time seen, which is what an as-of lookup returns
+        self.as_of_price = None
+        # Distinct times and as-of prices within the current bin, for delays that elapse before it closes
+        self.bin_times = []
+        self.bin_prices = []
+        # Min-heap of (target time, sequence, event, delay index) awaiting a P2 price
+        self.pending = []
+        self.pending_counts = {}
+        self.sequence = 0
+
+    def _bin_number(self, transaction_time):
+        elapsed = transaction_time - self.init_time
+        if self.time_scale == 1:
+            return int(elapsed / self.bucket_size)
+        return elapsed // self.bucket_units
+
+    def _on_tick(self, transaction_time, mid_price) -> list:
+        events = []
+        if self.init_time is None:
+            self.init_time = transaction_time
+        if transaction_time != self.last_time:
+            if self.pending and self.pending[0][0] < transaction_time:
+                events.extend(self._resolve_pending(transaction_time))
+            self.as_of_price = mid_price
+        bin_number = self._bin_number(transaction_time)
+        if bin_number != self.current_bin:
+            if self.current_bin is not None:
+                events.extend(self._close_bin(transaction_time))
+            self._open_bin(bin_number, transaction_time, mid_price)
+        else:
+            self._add_to_bin(transaction_time, mid_price)
+        if not self.bin_times or self.bin_times[-1] != transaction_time:
+            self.bin_times.append(transaction_time)
+            self.bin_prices.append(mid_price)
+        return events
+
+    def _open_bin(self, bin_number, transaction_time, mid_price):
+        self.current_bin = bin_number
+        self.bin_max = self.bin_min = mid_price
+        self.bin_max_time = self.bin_min_time = transaction_time
+        self.bin_max_idx = self.bin_min_idx = self.tick_count
+        self.bin_sum = mid_price
+        self.bin_count = 1
+        self.bin_times = []
+        self.bin_prices = []
+
+    def _add_to_bin(self, transaction_time, mid_price):
+        if mid_price > self.bin_max:
+            self.bin_max, self.bin_max_time, self.bin_max_idx = mid_price, transaction_time, self.tick_count
+        if mid_price < self.bin_min:
+            self.bin_min, self.bin_min_time, self.bin_min_idx = mid_price, transaction_time, self.tick_count
+        self.bin_sum += mid_price
+        self.bin_count += 1
+
+    def _close_bin(self, next_time) -> list:
+        direction = 1 if self.bin_min_time <= self.bin_max_time else -1
+        relative_price_change = direction * (self.bin_max - self.bin_min) / (self.bin_sum / self.bin_count)
+        start_price, end_price = (self.bin_min, self.bin_max) if direction == 1 else (self.bin_max, self.bin_min)
+        end_time = max(self.bin_max_time, self.bin_min_time)
+        event = {
+            "Time bin": self.current_bin * self.bucket_size,
+            "Mid price|max": self.bin_max,
+            "Mid price|min": self.bin_min,
+            "Mid price|mean": self.bin_sum / self.bin_count,
+            "Mid price|idxmax": self.bin_max_idx,
+            "Mid price|idxmin": self.bin_min_idx,
+            "Relative price change": relative_price_change,
+            "Max timestamp": self.bin_max_time,
+            "Min timestamp": self.bin_min_time,
+            "Direction": direction,
+            "Event end time": end_time,
+            "Event end price": end_price,
+            "Event size bucket": bisect_right(self.bucket_edges, relative_price_change) - self.zero_bucket,
+            "P0 Timestamp": min(self.bin_max_time, self.bin_min_time),
+            "P0": start_price,
+            "P1": end_price,
+        }
+        self.pending_counts[id(event)] = len(self.time_delays)
+        completed = []
+        for i, delay_units in enumerate(self.delay_units):
+            target = end_time + delay_units
+            if next_time is None or target < next_time:
+                # Target falls inside the closing bin, or before the tick that closed it
+                position = bisect_right(self.bin_times, target) - 1
+                completed.extend(self._set_post_event_price(event, i, self.bin_prices[position]))
+            else:
+                heapq.heappush(self.pending, (target, self.sequence, event, i))
+                self.sequence += 1
+        return completed
+
+    def _resolve_pending(self, transaction_time) -> list:
+        completed = []
+        while self.pending and (transaction_time is None or self.pending[0][0] < transaction_time):
+            _, _, event, i = heapq.heappop(self.pending)
+            completed.extend(self._set_post_event_price(event, i, self.as_of_price))
+        return completed
+
+    def _set_post_event_price(self, event, i, post_event_price) -> list:
+        label = f"at {self.time_delays[i]*1000} ms"
+        event[f"P2 {label}"] = post_event_price
+        event[f"P2-P0/P1-P0 {label}"] = _ratio(post_event_price - event["P0"], event["P1"] - event["P0"])
+        self.pending_counts[id(event)] -= 1
+        if self.pending_counts[id(event)] == 0:
+            del self.pending_counts[id(event)]
+            return [event]
+        return []
+
+    def flush(self) -> list:
+        # Earlier bins' pending delays resolve first so events stay in bin order
+        events = self._resolve_pending(None)
+        if self.current_bin is not None:
+            events.extend(self._close_bin(None))
+            self.current_bin = None
+        return events
+
+
+class StreamingDoubleEmaAnalyser(StreamingAnalyser):
+    # Online counterpart of DoubleEmaAnalyser: emits an event between consecutive EMA crossovers.
+
+    def __init__(self, halflife_short, halflife_long, time_scale=1, price_scale=1):
+        super().__init__(time_scale, price_scale)
+        self.halflife_short = halflife_short
+        self.halflife_long = halflife_long
+        self.ema_short = None
+        self.ema_long = None
+        self.weight_short = 0.0
+        self.weight_long = 0.0
+        self.is_above = False
+        self.previous_tick = None
+        self.last_crossover = None
+
+    @staticmethod
+    def _ema_step(average, weight, mid_price, decay):
+        # Same recurrence as pandas ewm(halflife=..., times=...).mean() with adjust=True
+        weight *= decay
+        if average != mid_price:
+            average = (weight * average + mid_price) / (weight + 1.0)
+        return average, weight + 1.0
+
+    def _on_tick(self, transaction_time, mid_price) -> list:
+        if self.ema_short is None:
+            self.ema_short = self.ema_long = mid_price
+            self.weight_short = self.weight_long = 1.0
+        else:
+            elapsed = (transaction_time - self.last_time) / self.time_scale
+            self.ema_short, self.weight_short = self._ema_step(
+                self.ema_short, self.weight_short, mid_price, 0.5 ** (elapsed / self.halflife_short))
+            self.ema_long, self.weight_long = self._ema_step(
+                self.ema_long, self.weight_long, mid_price, 0.5 ** (elapsed / self.halflife_long))
+        events = []
+        is_above = self.ema_short - self.ema_long > EMA_TIE_TOLERANCE * abs(self.ema_long)
+        if self.previous_tick is not None and is_above != self.is_above:
+            # The crossover is recorded at the tick before the sign change, as in get_ema_intersection_points
+            crossover = self.previous_tick
+            if self.last_crossover is not None:
+                events.append(self._event(self.last_crossover, crossover))
+            self.last_crossover = crossover
+        self.is_above = is_above
+        self.previous_tick = (self.tick_count, transaction_time, mid_price)
+        return events
+
+    def _event(self, start, end) -> dict:
+        start_idx, start_time, start_price = start
+        end_idx, end_time, end_price = end
+        return {
+            "Start idx": start_idx,
+            "End idx": end_idx,
+            "Start time": start_time,
+            "End time": end_time,
+            "Start price": start_price,
+            "End price": end_price,
+            "Duration": (end_time - start_time) / self.time_scale,
+            "Relative price change": (end_price - start_price) / start_price,
+        }
+
+
+def _ratio(numerator, denominator):
+    # Float division with the inf/nan results pandas gives for a zero denominator
+    if denominator == 0:
+        return math.nan if numerator == 0 else math.copysign(math.inf, numerator)
+    return numerator / denominator
@@ -0,0 +1,143 @@
+import math
+import numpy as np
+
+class Moments():
+    # Count, mean, variance (Welford's M2), min and max of the finite values seen. Two
+    # summaries merge exactly (Chan et al.), so partial results from workers can be combined
+    # in any order without keeping the values.
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if len(values):
+            other = Moments()
+            other.count = len(values)
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min, other.max = float(values.min()), float(values.max())
+            self.merge(other)
+        return self
+
+    def merge(self, other):
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def variance(self, ddof=1):
+        # ddof=1 matches pandas Series.var()/std()
+        return self.m2 / (self.count - ddof) if self.count > ddof else math.nan
+
+    def std(self, ddof=1):
+        return math.sqrt(self.variance(ddof))
+
+
+class Histogram():
+    # Counts of the finite values over fixed bin edges, with values below the first edge and at
+    # or above the last counted separately; NaN and infinite values are dropped, as in Moments
+    # and QuantileSketch, so all three count the same values. Histograms with the same edges
+    # merge by adding counts.
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        # Index 0 is the underflow and index len(edges) the overflow
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        positions = np.searchsorted(self.edges, values, side='right')
+        self.counts += np.bincount(positions, minlength=len(self.counts))
+        return self
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different edges cannot be merged")
+        self.counts += other.counts
+        return self
+
+    @property
+    def bin_counts(self) -> np.ndarray:
+        return self.counts[1:-1]
+
+    @property
+    def underflow(self) -> int:
+        return int(self.counts[0])
+
+    @property
+    def overflow(self) -> int:
+        return int(self.counts[-1])
+
+
+class QuantileSketch():
+    # Mergeable quantile sketch with relative error (DDSketch): each finite value is counted in
+    # a logarithmic bucket gamma**(k-1) < |x| <= gamma**k, so any quantile is returned within
+    # relative_accuracy of a value of that rank. Memory grows with the log of the value range,
+    # not with the number of values.
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-12):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # Magnitudes below min_value are counted as zero
+        self.min_value = min_value
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        is_zero = np.abs(values) < self.min_value
+        self.zero_count += int(np.count_nonzero(is_zero))
+        self.count += len(values)
+        values = values[~is_zero]
+        for store, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+        return self
+
+    def merge(self, other):
+        if self.gamma != other.gamma or self.min_value != other.min_value:
+            raise ValueError("Sketches with different accuracy cannot be merged")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        # Value at rank q * (count - 1) for each q, from the most negative bucket up
+        qs = np.asarray(qs, dtype=float)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        negative_keys = np.array(sorted(self.negative, reverse=True), dtype=np.int64)
+        positive_keys = np.array(sorted(self.positive), dtype=np.int64)
+        values = np.concatenate((-self.__bucket_values(negative_keys), [0.0], self.__bucket_values(positive_keys)))
+        counts = np.concatenate(([self.negative[key] for key in negative_keys.tolist()], [self.zero_count],
+                                 [self.positive[key] for key in positive_keys.tolist()]))
+        positions = np.searchsorted(np.cumsum(counts), qs * (self.count - 1), side='right')
+        return values[np.minimum(positions, len(values) - 1)]
+
+    def quantile(self, q) -> float:
+        return float(self.quantiles([q])[0])
+
+    def __bucket_values(self, keys):
+        # Midpoint in relative terms of each bucket's range
+        return 2 * self.gamma ** keys.astype(float) / (self.gamma + 1)
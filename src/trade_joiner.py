@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from binner import TimeBinner
+from preprocessor import mid_price
+
+FEATURE_COLUMNS = ['Trade volume', 'Trade count', 'VWAP', 'Signed flow', 'Flow imbalance']
+
+class TradeJoiner():
+    # Aligns public trades to the prevailing order book quote and aggregates them per time bin
+    # or per event window. Both time columns are used in sorted order, so the join is one
+    # forward pass with no per-trade lookups, and every aggregate is a segment or prefix sum.
+
+    def __init__(self, order_book: pd.DataFrame, public_trade: pd.DataFrame):
+        book_scales = order_book.attrs.get("scales", {})
+        trade_scales = public_trade.attrs.get("scales", {})
+        self.time_scale = book_scales.get("Transaction time", 1)
+        book_times = order_book["Transaction time"].to_numpy()
+        # Bins count from the first order book row, as in EventAnalyser.bin_data
+        self.origin = book_times[0] if len(book_times) else 0
+        self.book_order = self.__sort_order(book_times)
+        self.book_times = self.__take(book_times, self.book_order)
+        self.bid = self.__take(order_book["Bid price"].to_numpy(), self.book_order) / book_scales.get("Bid price", 1)
+        self.ask = self.__take(order_book["Ask price"].to_numpy(), self.book_order) / book_scales.get("Ask price", 1)
+        trade_times = public_trade["Transaction time"].to_numpy()
+        trade_order = self.__sort_order(trade_times)
+        self.trade_times = self.__take(trade_times, trade_order)
+        self.prices = self.__take(public_trade["Trade price"].to_numpy(), trade_order) / trade_scales.get("Trade price", 1)
+        self.qty = self.__take(public_trade["Trade qty"].to_numpy(), trade_order) / trade_scales.get("Trade qty", 1)
+        self._positions = None
+
+    @staticmethod
+    def __sort_order(times):
+        if len(times) > 1 and (times[1:] < times[:-1]).any():
+            return np.argsort(times, kind='stable')
+        return None
+
+    @staticmethod
+    def __take(values, order):
+        return values if order is None else values[order]
+
+    @staticmethod
+    def as_of_positions(left_times, right_times) -> np.ndarray:
+        # For each right time, the position of the last left time <= it (-1 if none); both sorted.
+        # With sorted keys numpy's searchsorted starts from the previous key's result, so this is
+        # a merge-like sweep (faster in practice than an explicit merge of the two columns).
+        return np.searchsorted(left_times, right_times, side='right') - 1
+
+    def prevailing_positions(self) -> np.ndarray:
+        # Sorted order book position of the quote in force at each trade, in trade time order
+        if self._positions is None:
+            self._positions = self.as_of_positions(self.book_times, self.trade_times)
+        return self._positions
+
+    def prevailing_quotes(self) -> pd.DataFrame:
+        # Each trade (in time order) with the bid, ask and order book row prevailing at its time
+        positions = self.prevailing_positions()
+        has_quote = positions >= 0
+        safe = np.where(has_quote, positions, 0)
+        rows = safe if self.book_order is None else self.book_order[safe]
+        return pd.DataFrame({
+            "Transaction time": self.trade_times,
+            "Trade price": self.prices,
+            "Trade qty": self.qty,
+            "Order book row": np.where(has_quote, rows, -1),
+            "Bid price": np.where(has_quote, self.bid[safe], np.nan),
+            "Ask price": np.where(has_quote, self.ask[safe], np.nan),
+        })
+
+    def trade_signs(self) -> np.ndarray:
+        # +1 buyer initiated, -1 seller initiated. Signed quantities are used as given; otherwise
+        # trades above the prevailing mid are buys and below it sells (0 at the mid or with no quote).
+        if (self.qty < 0).any():
+            return np.sign(self.qty)
+        positions = self.prevailing_positions()
+        has_quote = positions >= 0
+        safe = np.where(has_quote, positions, 0)
+        mid = mid_price(self.bid[safe], self.ask[safe])
+        return np.where(has_quote, np.sign(self.prices - mid), 0.0)
+
+    def bin_features(self, bucket_size=0.1) -> pd.DataFrame:
+        # Trade volume, count, VWAP and signed flow per bin, indexed like EventAnalyser.bin_data
+        if len(self.trade_times) == 0:
+            return pd.DataFrame(columns=FEATURE_COLUMNS, index=pd.Index([], name='Time bin'))
+        bins = TimeBinner.bin_numbers(self.trade_times, self.origin, bucket_size, self.time_scale)
+        starts = np.flatnonzero(np.concatenate(([True], bins[1:] != bins[:-1])))
+        volume = np.abs(self.qty)
+        sums = {
+            "volume": np.add.reduceat(volume, starts),
+            "count": np.diff(np.append(starts, len(bins))),
+            "notional": np.add.reduceat(self.prices * volume, starts),
+            "signed": np.add.reduceat(self.trade_signs() * volume, starts),
+        }
+        return self.__to_frame(sums, pd.Index(bins[starts] * bucket_size, name='Time bin'))
+
+    def window_features(self, start_times, end_times) -> pd.DataFrame:
+        # The same features over trades with start <= time < end, one row per window, from
+        # prefix sums built one at a time to limit memory
+        start_times, end_times = np.asarray(start_times), np.asarray(end_times)
+        low = np.searchsorted(self.trade_times, start_times, side='left')
+        high = np.maximum(np.searchsorted(self.trade_times, end_times, side='left'), low)
+        volume = np.abs(self.qty)
+        def window_sum(values):
+            prefix = np.concatenate(([0.0], np.cumsum(values)))
+            return prefix[high] - prefix[low]
+        sums = {
+            "volume": window_sum(volume),
+            "count": high - low,
+            "notional": window_sum(self.prices * volume),
+            "signed": window_sum(self.trade_signs() * volume),
+        }
+        return self.__to_frame(sums, None)
+
+    @staticmethod
+    def __to_frame(sums, index):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(sums["volume"] > 0, sums["notional"] / sums["volume"], np.nan)
+            imbalance = np.where(sums["volume"] > 0, sums["signed"] / sums["volume"], np.nan)
+        return pd.DataFrame({
+            'Trade volume': sums["volume"],
+            'Trade count': sums["count"],
+            'VWAP': vwap,
+            'Signed flow': sums["signed"],
+            'Flow imbalance': imbalance,
+        }, index=index)
@@ -3,58 +3,117 @@ import matplotlib as mpl
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
-from datetime import datetime
 from hdf5reader import HDF5Reader
 from event_analyser import *
+from result_cache import ResultCache
+from downsampler import min_max_indices, lttb_indices
+from preprocessor import OrderBookPreprocessor, PublicTradePreprocessor
 
 class Visualiser():
 
-    def __init__(self, order_book, public_trade) -> None:
+    def __init__(self, order_book, public_trade, cache: ResultCache = None, dataset_key: str = None,
+                 downsample: str = 'minmax', dpi: int = 300) -> None:
         self.order_book = order_book
         self.public_trade = public_trade
-        self.utc_to_timestamp()
+        # Derived columns come from shared preprocessors; the input frames are not modified
+        self.book = OrderBookPreprocessor(order_book)
+        self.trades = PublicTradePreprocessor(public_trade)
+        # Caching is opt-in: without a ResultCache, results are computed on each call
+        self.cache = cache
+        # Identifies the input data in cache keys; hashed from the frames unless given
+        self.dataset_key = dataset_key
+        if cache is not None and dataset_key is None:
+            self.dataset_key = cache.key(ResultCache.frame_hash(order_book), ResultCache.frame_hash(public_trade))
+        # Lines longer than the axes' width in pixels at dpi are reduced with 'minmax', 'lttb' or None
+        self.downsample = downsample
+        self.dpi = dpi
+
+    @classmethod
+    def from_files(cls, order_book_path, public_trade_path, cache: ResultCache = None):
+        # Keyed by the .h5 content hashes, so cached results are dropped when either file changes
+        dataset_key = None
+        if cache is not None:
+            dataset_key = cache.key(cache.source_hash(order_book_path), cache.source_hash(public_trade_path))
+        return cls(HDF5Reader.read_data(order_book_path), HDF5Reader.read_data(public_trade_path),
+                   cache, dataset_key)
+
+    def __cached(self, name, params: tuple, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute((name, self.dataset_key) + tuple(params), compute)
 
     def visualise(self):
         pass
 
     def utc_to_timestamp(self):
-        self.order_book['Transaction UTC'] = self.__get_datetime(self.order_book)
-        self.public_trade['Transaction UTC'] = self.__get_datetime(self.public_trade)
+        # Converted on first use only
+        return self.book.column('Transaction UTC'), self.trades.column('Transaction UTC')
 
-    @staticmethod
-    def __get_mid_price(df):
-        df['Mid price'] = 0.5 * (df['Bid price'] + df['Ask price'])
-        return df['Mid price']
-    
-    @staticmethod
-    def __get_datetime(df):
-        timestamps = np.array(df["Transaction time"])
-        utc = np.array([datetime.fromtimestamp(ts) for ts in timestamps])
-        return utc
+    def __get_mid_price(self):
+        return self.__cached('Mid price', (), self.book.get_mid_price)
+
+    def __get_spread(self):
+        return self.__cached('Spread', (), lambda: self.book.column('Spread'))
+
+    def __plot_line(self, ax, x, y, *args, **kwargs):
+        # Plot at most a few points per pixel column, keeping the visual shape of the line
+        x, y = np.asarray(x), np.asarray(y)
+        pixels = max(int(ax.bbox.width / ax.figure.dpi * self.dpi), 1)
+        if self.downsample == 'minmax':
+            keep = min_max_indices(x, y, pixels)
+        elif self.downsample == 'lttb':
+            keep = lttb_indices(x, y, 2 * pixels)
+        else:
+            keep = slice(None)
+        return ax.plot(x[keep], y[keep], *args, **kwargs)
     
-    @staticmethod
-    def __get_spread(df):
-        df['Spread'] = df['Ask price'] - df['Bid price']
-        return df['Spread']
+    def __binned_data(self, bucket_edges=EVENT_SIZE_BUCKET_EDGES):
+        # Binned events table as built by EventAnalyser.analyse, without rewriting the Excel output
+        def compute():
+            return EventAnalyser(self.book, self.trades, bucket_edges).analyse(save=False)
+        return self.__cached('Binned data', (list(bucket_edges),), compute)
+
+    def __post_event_distribution(self, bin, delay, bucket_edges=EVENT_SIZE_BUCKET_EDGES):
+        def compute():
+            ea = EventAnalyser(self.book, self.trades, bucket_edges)
+            ea.binned_data = self.__binned_data(bucket_edges)
+            return ea.get_relative_price_change_distribution(bin, delay)
+        return self.__cached('Post event distribution', (list(bucket_edges), bin, delay), compute)
+
+    def __double_ema(self, hl_short, hl_long):
+        # EMAs, crossover indices and crossover events for one pair of halflives
+        def compute():
+            ea = DoubleEmaAnalyser(self.book, self.trades, hl_short, hl_long)
+            return {
+                "EMA Short": ea.order_book["EMA Short"].to_numpy(),
+                "EMA Long": ea.order_book["EMA Long"].to_numpy(),
+                "Crossovers": (ea.idx_ups, ea.idx_downs),
+                "Events": ea.get_events(),
+            }
+        return self.__cached('Double EMA', (hl_short, hl_long), compute)
+
+    def __ema_variance(self, halflife):
+        def compute():
+            variance = EmaVarianceAnalyser(self.book, self.trades).get_ema_variance(halflife)
+            return variance, EmaVarianceAnalyser.variance_peaks(variance)
+        return self.__cached('EMA variance', (halflife,), compute)
 
     def plot_mid_price(self, ax):
-        self.__get_mid_price(self.order_book)
         xfmt = mpl.dates.DateFormatter('%Y-%m-%d %H:%M:%S')
         ax.xaxis.set_major_formatter(xfmt)
-        ax.plot(self.order_book['Transaction UTC'], self.order_book['Mid price'])
+        self.__plot_line(ax, self.book.column('Transaction UTC'), self.__get_mid_price())
         plt.xticks(rotation=25, ha='right')
         plt.subplots_adjust(left=0.2, bottom=0.3)
         ax.set_title('Order Book Mid Price')
         ax.set_ylabel('Price (USD)')
 
     def plot_volume(self, ax):
-        ax.plot(self.public_trade['Transaction UTC'], np.abs(self.public_trade['Trade qty']))
+        self.__plot_line(ax, self.trades.column('Transaction UTC'), self.trades.column('Trade volume'))
         ax.set_title('Public Trade Volume')
         ax.set_ylabel('Traded Qty (Volume)')
 
     def plot_spread(self, ax):
-        self.__get_spread(self.order_book)
-        ax.plot(self.order_book['Transaction UTC'], self.order_book['Spread'])
+        self.__plot_line(ax, self.book.column('Transaction UTC'), self.__get_spread())
         ax.set_title('Order Book Spread')
         ax.set_ylabel('(USD)')
 
@@ -65,13 +124,10 @@ class Visualiser():
         self.plot_spread(ax2)
         plt.xlabel('Time UTC')
         plt.tight_layout()
-        plt.savefig('basic_data.png', dpi=300)
+        plt.savefig('basic_data.png', dpi=self.dpi)
 
     def plot_price_change_distribution(self):
-        # Get data (Need to change to be separate)
-        ea = EventAnalyser(self.order_book, self.public_trade)
-        ea.analyse()
-        binned_data = ea.binned_data
+        binned_data = self.__binned_data()
         # Plot price change
         price_change = binned_data['Relative price change']
         fig, ax = plt.subplots()
@@ -81,23 +137,11 @@ class Visualiser():
         ax.set_ylabel('Count')
         ax.set_xlabel(r'$\frac{\Delta P}{\bar{P}}$')
         plt.tight_layout()
-        plt.savefig('price_change_distribution.png', dpi=300)
-
-    def plot_post_event_price_change_dist(self, bin: int, delay):
-        event_size_dict = {
-            -4: "(-∞, -0.0040)",
-            -3: "[-0.0040, -0.0020)",
-            -2: "[-0.0020, -0.0010)",
-            -1: "[-0.0010, -0.0005)",
-            0: "[-0.0005, 0.0005)",
-            1: "[0.0005, 0.0010)",
-            2: "[0.0010, 0.0020)",
-            3: "[0.0020, 0.0040)",
-            4: "[0.0040, ∞)"
-        }
-        ea = EventAnalyser(self.order_book, self.public_trade)
-        ea.analyse()
-        dist = ea.get_relative_price_change_distribution(bin, delay)
+        plt.savefig('price_change_distribution.png', dpi=self.dpi)
+
+    def plot_post_event_price_change_dist(self, bin: int, delay, bucket_edges=EVENT_SIZE_BUCKET_EDGES):
+        event_size_dict = EventAnalyser.event_size_bucket_labels(bucket_edges)
+        dist = self.__post_event_distribution(bin, delay, bucket_edges)
         mean = dist.mean()
         std_dev = dist.std()
         n = dist.count()
@@ -113,16 +157,17 @@ class Visualiser():
         plt.savefig(f"post_event_price_change_distribution_{delay}_{bin}.png")
 
     def plot_double_ema(self, ema_1_hl, ema_2_hl):
-        ea = DoubleEmaAnalyser(self.order_book, self.public_trade)
-        ea.get_double_ema(ema_1_hl, ema_2_hl)
-        ups_idx, downs_idx = ea.get_ema_intersection_points(self.order_book["EMA Short"], self.order_book["EMA Long"])
+        double_ema = self.__double_ema(ema_1_hl, ema_2_hl)
+        times, mid_price = self.book.column("Transaction time"), self.__get_mid_price()
+        ema_short, ema_long = double_ema["EMA Short"], double_ema["EMA Long"]
+        ups_idx, downs_idx = double_ema["Crossovers"]
         _, (ax_price, ax_diff) = plt.subplots(2, 1, sharex='col')
-        ax_price.plot(self.order_book["Transaction time"], self.order_book["Mid price"], label = "Mid price", color='grey')
-        ax_price.plot(self.order_book["Transaction time"], self.order_book["EMA Short"], label = f"EMA {ema_1_hl}s")
-        ax_price.plot(self.order_book["Transaction time"], self.order_book["EMA Long"], label = f"EMA {ema_2_hl}s")
-        ax_price.plot(self.order_book["Transaction time"][ups_idx], self.order_book["EMA Short"][ups_idx], "go")
-        ax_price.plot(self.order_book["Transaction time"][downs_idx], self.order_book["EMA Short"][downs_idx], "ro")
-        ax_diff.plot(self.order_book["Transaction time"], self.order_book["EMA Short"] - self.order_book["EMA Long"])
+        self.__plot_line(ax_price, times, mid_price, label = "Mid price", color='grey')
+        self.__plot_line(ax_price, times, ema_short, label = f"EMA {ema_1_hl}s")
+        self.__plot_line(ax_price, times, ema_long, label = f"EMA {ema_2_hl}s")
+        ax_price.plot(times[ups_idx], ema_short[ups_idx], "go")
+        ax_price.plot(times[downs_idx], ema_short[downs_idx], "ro")
+        self.__plot_line(ax_diff, times, ema_short - ema_long)
         ax_diff.axhline(color = 'grey', ls = '--')
         ax_diff.set_xlabel("Timestamp")
         ax_diff.set_ylabel("Difference")
@@ -132,35 +177,34 @@ class Visualiser():
         ax_price.autoscale(axis='y')
         plt.show()
 
-    def plot_ema_variance(self, halflife, alpha: float):
-        ea = EmaVarianceAnalyser(self.order_book, self.public_trade)
-        variance = ea.get_ema_variance(halflife, alpha)
-        peak_idx, var_threshold, peak_widths = ea.variance_peaks(variance)
+    def plot_ema_variance(self, halflife):
+        variance, (peak_idx, var_threshold, peak_widths) = self.__ema_variance(halflife)
+        times, mid_price = self.book.column("Transaction time"), self.__get_mid_price()
+        variance = variance.to_numpy()
         fig, (ax_price, ax_var) = plt.subplots(2, 1, sharex='col')
-        ax_var.plot(self.order_book["Transaction time"], variance)
+        self.__plot_line(ax_var, times, variance)
         ax_var.set_xlabel("Timestamp")
         ax_var.set_ylabel("EMA Variance")
         ax_price.set_ylabel("Mid price")
         ax_var.hlines(peak_widths[1],
-                      self.order_book["Transaction time"][peak_widths[2].astype(int)],
-                      self.order_book["Transaction time"][peak_widths[3].astype(int)],
+                      times[peak_widths[2].astype(int)],
+                      times[peak_widths[3].astype(int)],
                       color="orange",
                       ls = 'dashed')
-        ax_var.plot(self.order_book["Transaction time"][peak_idx], variance[peak_idx], 'rx', label="P1")
-        ax_var.plot(self.order_book["Transaction time"][peak_widths[2].astype(int)], variance[peak_widths[2].astype(int)], 'gx', label = "P0")
-        ax_var.plot(self.order_book["Transaction time"][peak_widths[3].astype(int)], variance[peak_widths[3].astype(int)], 'bx', label = "P2")
-        ax_price.plot(self.order_book["Transaction time"], self.order_book["Mid price"], label = "Mid price", color='grey')
-        ax_price.plot(self.order_book["Transaction time"][peak_idx], self.order_book["Mid price"][peak_idx], 'rx', label = "P1")
-        ax_price.plot(self.order_book["Transaction time"][peak_widths[2].astype(int)], self.order_book["Mid price"][peak_widths[2].astype(int)],'gx', label = 'P0')
-        ax_price.plot(self.order_book["Transaction time"][peak_widths[3].astype(int)], self.order_book["Mid price"][peak_widths[3].astype(int)],'bx', label = 'P2')
+        ax_var.plot(times[peak_idx], variance[peak_idx], 'rx', label="P1")
+        ax_var.plot(times[peak_widths[2].astype(int)], variance[peak_widths[2].astype(int)], 'gx', label = "P0")
+        ax_var.plot(times[peak_widths[3].astype(int)], variance[peak_widths[3].astype(int)], 'bx', label = "P2")
+        self.__plot_line(ax_price, times, mid_price, label = "Mid price", color='grey')
+        ax_price.plot(times[peak_idx], mid_price[peak_idx], 'rx', label = "P1")
+        ax_price.plot(times[peak_widths[2].astype(int)], mid_price[peak_widths[2].astype(int)],'gx', label = 'P0')
+        ax_price.plot(times[peak_widths[3].astype(int)], mid_price[peak_widths[3].astype(int)],'bx', label = 'P2')
         ax_price.legend()
         ax_var.legend()
-        fig.suptitle(f'Halflife: {halflife}, Alpha: {alpha}')
+        fig.suptitle(f'Halflife: {halflife}')
         plt.show()
 
     def plot_duration_size_corr(self, hl_s, hl_l):
-        ea = DoubleEmaAnalyser(self.order_book, self.public_trade, hl_s, hl_l)
-        events = ea.get_events()
+        events = self.__double_ema(hl_s, hl_l)["Events"]
         time_susbset = events[events["Duration"] < 1.0]
         data = time_susbset[time_susbset["Relative price change"] != 0.0]
         mean_rpc = np.mean(time_susbset["Relative price change"])
@@ -175,7 +219,4 @@ class Visualiser():
         plt.show()
 
 if __name__ == '__main__':
-    hdfr = HDF5Reader()
-    obf = HDF5Reader.read_data('data/sample/order_book.h5')
-    ptf = HDF5Reader.read_data('data/sample/public_trade.h5')
-    Visualiser(obf, ptf).plot_duration_size_corr(0.001, 0.008)
+    Visualiser.from_files('data/sample/order_book.h5', 'data/sample/public_trade.h5').plot_duration_size_corr(0.001, 0.008)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from batch_analyser import PostEventSummary, HISTOGRAM_EDGES
+
+
+def test_merged_partitions_match_one_pass():
+    rng = np.random.default_rng(7)
+    values = {(bucket, delay): rng.standard_t(3, 2000) * (1 + abs(bucket))
+              for bucket in (-2, 0, 3) for delay in (0.1, 1.0)}
+    one_pass = PostEventSummary()
+    partitions = [PostEventSummary() for _ in range(4)]
+    for (bucket, delay), changes in values.items():
+        one_pass.update(bucket, delay, changes)
+        # Uneven parts in random partitions, so some partitions have no events for this key
+        for part in np.split(changes, np.sort(rng.choice(len(changes), 5))):
+            partitions[rng.integers(len(partitions))].update(bucket, delay, part)
+    merged = PostEventSummary()
+    for partition in partitions:
+        merged.merge(partition)
+    found, expected = merged.to_frame(), one_pass.to_frame()
+    exact = ["Event size bucket", "Time delay", "Count", "Min", "Max", "Below histogram", "Above histogram"]
+    pd.testing.assert_frame_equal(found[exact], expected[exact])
+    pd.testing.assert_frame_equal(found, expected, check_exact=False, rtol=1e-9)
+    for (bucket, delay), changes in values.items():
+        row = found[(found["Event size bucket"] == bucket) & (found["Time delay"] == delay)].iloc[0]
+        assert np.isclose(row["Mean"], changes.mean()) and np.isclose(row["Std"], changes.std(ddof=1))
+        counts, _ = np.histogram(changes, HISTOGRAM_EDGES)
+        histogram = merged.histogram(bucket, delay)
+        # np.histogram closes its last bin, the summary counts the last edge as overflow
+        counts[-1] -= np.count_nonzero(changes == HISTOGRAM_EDGES[-1])
+        np.testing.assert_array_equal(histogram.bin_counts, counts)
+        assert histogram.underflow == np.count_nonzero(changes < HISTOGRAM_EDGES[0])
+        assert histogram.overflow == np.count_nonzero(changes >= HISTOGRAM_EDGES[-1])
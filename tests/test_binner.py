@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from binner import TimeBinner
+
+
+def groupby_reference(times, values, bucket_size):
+    # The per-bin statistics EventAnalyser.bin_data computed with a pandas groupby
+    df = pd.DataFrame({'Transaction time': times, 'Mid price': values})
+    bins = ((times - times[0]) / bucket_size).astype(int)
+    grouped = df.groupby(bins)['Mid price'].agg(['max', 'min', 'mean', 'idxmax', 'idxmin'])
+    grouped.index = pd.Index(grouped.index * bucket_size, name='Time bin')
+    return grouped
+
+
+def test_levels_match_groupby():
+    rng = np.random.default_rng(4)
+    times = np.sort(rng.uniform(0, 20, 5000))
+    times[100:110] = times[100]
+    # Rounded prices so bins have tied extremes, resolved to the first row as idxmax does
+    values = np.round(100 + np.cumsum(rng.normal(0, 0.05, len(times))), 1)
+    bucket_sizes = [0.1, 0.5, 1.0, 0.3, 2.5]
+    levels = TimeBinner(times, values).bin(bucket_sizes)
+    assert list(levels) == bucket_sizes
+    for bucket_size, level in levels.items():
+        expected = groupby_reference(times, values, bucket_size)
+        np.testing.assert_allclose(level.index, expected.index)
+        for statistic in ('max', 'min', 'mean'):
+            np.testing.assert_allclose(level[f'Mid price|{statistic}'], expected[statistic])
+        for statistic in ('idxmax', 'idxmin'):
+            np.testing.assert_array_equal(level[f'Mid price|{statistic}'], expected[statistic])
+        np.testing.assert_array_equal(level['Max timestamp'], times[expected['idxmax']])
+        np.testing.assert_array_equal(level['Min timestamp'], times[expected['idxmin']])
+
+
+def test_unsorted_fixed_point_times_match_groupby():
+    rng = np.random.default_rng(5)
+    time_scale = 1_000_000
+    times = rng.integers(0, 10 * time_scale, 2000)
+    values = rng.normal(100, 1, len(times))
+    levels = TimeBinner(times, values, time_scale=time_scale).bin([0.1, 1.0])
+    for bucket_size, level in levels.items():
+        expected = groupby_reference(times, values, bucket_size * time_scale)
+        np.testing.assert_allclose(level.index * time_scale, expected.index)
+        np.testing.assert_allclose(level['Mid price|mean'], expected['mean'])
+        np.testing.assert_array_equal(level['Mid price|idxmax'], expected['idxmax'])
+        np.testing.assert_array_equal(level['Mid price|idxmin'], expected['idxmin'])
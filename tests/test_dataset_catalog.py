@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dataset_catalog import DatasetCatalog
+from hdf5reader import HDF5Reader
+
+
+def write_partition(path, start, rows=10):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    times = start + np.arange(rows, dtype=float)
+    HDF5Reader.write_data(str(path), pd.DataFrame({"Transaction time": times, "Bid price": times}), table=True)
+
+
+def test_scan_takes_instrument_above_day_directories(tmp_path):
+    write_partition(tmp_path / "ABC" / "day1" / "order_book.h5", 0)
+    write_partition(tmp_path / "ABC" / "day2" / "order_book.h5", 100)
+    write_partition(tmp_path / "XYZ" / "day1" / "order_book.h5", 0)
+    catalog = DatasetCatalog(str(tmp_path / "index.json"))
+    catalog.scan(str(tmp_path))
+    assert sorted(p["instrument"] for p in catalog.partitions) == ["ABC", "ABC", "XYZ"]
+    df = catalog.load_data("ABC", 5, 105, use_threads=True)
+    assert list(df["Transaction time"]) == list(range(5, 10)) + list(range(100, 105))
+
+
+def test_scan_with_instrument_pattern_or_ambiguous_layout(tmp_path):
+    write_partition(tmp_path / "ABC_20240102_order_book.h5", 0)
+    catalog = DatasetCatalog(str(tmp_path / "index.json"))
+    with pytest.raises(ValueError):
+        catalog.scan(str(tmp_path))
+    catalog.scan(str(tmp_path), instrument_pattern=r'(?P<instrument>[A-Z]+)_\d{8}_')
+    assert [p["instrument"] for p in catalog.partitions] == ["ABC"]
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from event_analyser import EventAnalyser, DoubleEmaAnalyser
+from stream_analyser import StreamingDoubleEmaAnalyser
+
+
+def test_as_of_lookup_ignores_stale_sorted_flag():
+    order_book = pd.DataFrame({"Transaction time": [1.0, 2.0, 3.0, 4.0], "Mid price": [10.0, 20.0, 30.0, 40.0]})
+    order_book.attrs["sorted"] = True
+    # attrs are carried through the reordering, so the flag no longer holds
+    reversed_book = order_book.sort_values("Transaction time", ascending=False)
+    assert reversed_book.attrs["sorted"]
+    prices, positions = EventAnalyser.get_most_recent_prices([2.5, 4.0], reversed_book)
+    np.testing.assert_array_equal(prices, [20.0, 40.0])
+
+
+def crossover_events():
+    changes = np.array([-0.03, -0.012, -0.004, 0.0, 0.004, 0.012, 0.03, 0.05])
+    return pd.DataFrame({"Duration": [0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 2.0], "Relative price change": changes})
+
+
+def test_filter_events_default_keeps_one_standard_deviation():
+    events = crossover_events()
+    short = events[events["Duration"] < 1.0]["Relative price change"]
+    mean, std = np.mean(short), np.std(short)
+    expected = short[(short > mean + std) | (short < mean - std)]
+    filtered = DoubleEmaAnalyser.filter_events(events)
+    pd.testing.assert_index_equal(filtered.index, expected.index)
+    assert list(filtered["Relative price change"]) == [-0.03, 0.03]
+
+
+def test_filter_events_min_price_std_narrows_the_selection():
+    events = crossover_events()
+    assert list(DoubleEmaAnalyser.filter_events(events, min_price_std=0.5)["Relative price change"]) == [-0.03, -0.012, 0.012, 0.03]
+    assert DoubleEmaAnalyser.filter_events(events, min_price_std=3.0).empty
+
+
+def test_ema_crossovers_match_pandas_over_flat_stretches():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    times = np.cumsum(rng.exponential(0.01, n))
+    steps = rng.choice([-1.0, 0.0, 0.0, 0.0, 1.0], n)
+    steps[5000:12_000] = 0.0
+    order_book = pd.DataFrame({"Transaction time": times, "Bid price": 100.0 + np.cumsum(steps) - 0.5})
+    order_book["Ask price"] = order_book["Bid price"] + 1.0
+    order_book["Mid price"] = order_book["Bid price"] + 0.5
+    analyser = DoubleEmaAnalyser(order_book, None, 0.1, 1.0)
+    utc = pd.to_datetime(times, unit='s')
+    mid_price = order_book["Mid price"]
+    short_ema, long_ema = (mid_price.ewm(halflife=pd.Timedelta(seconds=halflife), times=utc).mean()
+                           for halflife in (0.1, 1.0))
+    idx_ups, idx_downs = DoubleEmaAnalyser.get_ema_intersection_points(short_ema, long_ema)
+    np.testing.assert_array_equal(analyser.idx_ups, idx_ups)
+    np.testing.assert_array_equal(analyser.idx_downs, idx_downs)
+    streamed = StreamingDoubleEmaAnalyser(0.1, 1.0).update_frame(order_book)
+    assert [event["End idx"] for event in streamed] == list(analyser.get_events()["End idx"])
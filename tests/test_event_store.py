@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from event_store import EventStore, RUN_COLUMN
+
+
+def crossover_events(seed, rows=500, time_scale=1000):
+    # Events as DoubleEmaAnalyser.get_events returns them, with times in time_scale units
+    rng = np.random.default_rng(seed)
+    start = np.sort(rng.integers(0, 100 * time_scale, rows))
+    duration = rng.exponential(0.5, rows)
+    return pd.DataFrame({
+        "Start time": start,
+        "End time": start + (duration * time_scale).astype(np.int64),
+        "Duration": duration,
+        "Relative price change": rng.normal(0, 0.002, rows),
+    })
+
+
+def test_query_and_delete_round_trip(tmp_path):
+    store = EventStore(str(tmp_path / "events.h5"))
+    assert store.query("crossover").empty
+    runs = [crossover_events(seed) for seed in (0, 1)]
+    for run_id, events in enumerate(runs):
+        assert store.append(events, "crossover", {"seed": run_id}, time_scale=1000) == run_id
+    stored = pd.concat([EventStore.normalise(events, "crossover", 1000).assign(**{RUN_COLUMN: run_id})
+                        for run_id, events in enumerate(runs)], ignore_index=True)
+    assert len(store.query("crossover")) == len(stored)
+    start, duration, bucket = stored["Start time"], stored["Duration"], stored["Event size bucket"]
+    queries = [
+        (dict(start_time=20.0, end_time=40.0), (start >= 20) & (start < 40)),
+        (dict(buckets=[-1, 2]), bucket.isin([-1, 2])),
+        (dict(min_duration=0.25, max_duration=1.0), (duration >= 0.25) & (duration < 1.0)),
+        (dict(start_time=50.0, buckets=[0], run_ids=[1]), (start >= 50) & (bucket == 0) & (stored[RUN_COLUMN] == 1)),
+    ]
+    for params, mask in queries:
+        found = store.query("crossover", **params)
+        expected = stored[mask]
+        assert len(found) == len(expected) > 0
+        pd.testing.assert_frame_equal(found.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_like=True)
+    assert store.query("crossover", buckets=[]).empty
+    assert store.query("crossover", start_time=1000.0).empty
+    assert store.query("binned").empty
+    assert store.find_run("crossover", {"seed": 1}) == 1
+    store.delete_run(0)
+    assert [run["run_id"] for run in store.runs()] == [1]
+    remaining = store.query("crossover", columns=["Start time", RUN_COLUMN])
+    assert list(remaining.columns) == ["Start time", RUN_COLUMN]
+    assert len(remaining) == len(runs[1]) and (remaining[RUN_COLUMN] == 1).all()
+    assert store.query("crossover", run_ids=[0]).empty
+    assert store.append(runs[0], "crossover", time_scale=1000) == 2
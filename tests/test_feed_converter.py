@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from feed_generator import FeedGenerator
+from feed_converter import OrderBookFeedConverter, PublicTradeFeedConverter, main
+from hdf5reader import HDF5Reader
+
+
+def test_trade_seq_ids_are_not_counted_as_gaps():
+    # Generated trades share the order book's Seq Ids, so they skip most of the sequence
+    _, trade_bytes = FeedGenerator(20_000, seed=2).to_bytes()
+    converter = PublicTradeFeedConverter(trade_bytes, chunk_size=1000)
+    list(converter._iter_dataframes())
+    report = converter.validation
+    assert report["records"] == len(trade_bytes) // PublicTradeFeedConverter.dtype.itemsize
+    assert report["sequence_gaps"] == report["missing_records"] == 0
+    assert report["sorted"] and report["unique"]
+
+
+def test_rerun_with_other_options_reconverts(tmp_path, capsys):
+    feeds = tmp_path / "ABC"
+    FeedGenerator(5000, seed=1).write(str(feeds / "order_book.feed"), str(feeds / "public_trade.feed"))
+    args = ['-j', '1', '-o', str(tmp_path / "out"), str(feeds)]
+    assert main(args) == 0
+    assert main(args) == 0
+    assert capsys.readouterr().out.count("is up to date, skipped") == 2
+    assert main(['--fixed-point'] + args) == 0
+    assert "up to date" not in capsys.readouterr().out
+    book = HDF5Reader.read_data(str(tmp_path / "out" / "order_book.h5"))
+    assert book["Bid price"].dtype == np.int64 and book.attrs["conversion"]["fixed_point"]
+
+
+def test_converted_files_are_indexed_tables(tmp_path):
+    book_bytes, _ = FeedGenerator(5000, seed=3).to_bytes()
+    for chunk_size in (None, 1000):
+        path = str(tmp_path / f"order_book_{chunk_size}.h5")
+        OrderBookFeedConverter(book_bytes, chunk_size).convert(path)
+        with pd.HDFStore(path, mode='r') as store:
+            storer = store.get_storer('df')
+            assert storer.is_table and storer.table.cols._f_col("Transaction time").is_indexed
+        book = HDF5Reader.read_data(path)
+        start, end = book["Transaction time"].iloc[[1000, 2000]]
+        window = HDF5Reader.read_window(path, start, end, columns=["Transaction time", "Bid price"])
+        expected = book.loc[(book["Transaction time"] >= start) & (book["Transaction time"] < end),
+                            ["Transaction time", "Bid price"]]
+        pd.testing.assert_frame_equal(window, expected)
+
+
+def book_records(seq_ids, times=None):
+    # Order book records with the given Seq Ids, at 10 ns per Seq Id unless times are given
+    seq_ids = np.asarray(seq_ids)
+    records = np.zeros(len(seq_ids), dtype=OrderBookFeedConverter.dtype)
+    records["Seq Id"] = seq_ids
+    records["Transaction time"] = seq_ids * 10 if times is None else times
+    records["Bid price"] = seq_ids * 100
+    return records
+
+
+def test_normalise_sorts_drops_duplicates_and_counts_gaps():
+    # Seq Ids 8 and 15 to 17 are missing
+    expected = book_records([*range(1, 8), *range(9, 15), *range(18, 31)])
+    records = expected.copy()
+    records[[2, 3]] = records[[3, 2]]
+    # A repeat of Seq Id 5 at the same time and one of Seq Id 9 after the original
+    repeats = book_records([5, 9], times=[50, 95])
+    repeats["Bid price"] += 1
+    records = np.concatenate((records[:5], repeats[:1], records[5:8], repeats[1:], records[8:]))
+    converter = OrderBookFeedConverter(records.tobytes())
+    normalised = converter._normalise(converter._unpack_to_arr())
+    np.testing.assert_array_equal(normalised, expected)
+    report = converter.validation
+    assert report["records"] == len(records)
+    assert report["out_of_order"] == 1 and report["duplicates"] == 2
+    assert report["sequence_gaps"] == 2 and report["missing_records"] == 4
+    assert report["sorted"] and report["unique"] and report["replayed"] == 0
+
+
+def test_chunked_normalise_counts_replays_across_chunks():
+    # Seq Id 20 is missing, and 10 to 12 are replayed after Seq Id 40
+    seq_ids = [*range(1, 20), *range(21, 41), 10, 11, 12]
+    converter = OrderBookFeedConverter(book_records(seq_ids).tobytes(), chunk_size=10)
+    rows = sum(len(df) for df in converter._iter_dataframes())
+    report = converter.validation
+    assert rows == report["records"] == len(seq_ids)
+    assert report["replayed"] == 3 and report["duplicates"] == 0
+    assert report["sequence_gaps"] == 1 and report["missing_records"] == 1
+    assert not report["sorted"] and not report["unique"]
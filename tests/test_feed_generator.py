@@ -0,0 +1,15 @@
+from feed_generator import FeedGenerator, BLOCK_SIZE
+
+
+def test_output_does_not_depend_on_chunk_size():
+    n_records = 2 * BLOCK_SIZE + 5000
+    whole = FeedGenerator(n_records, 'jumpy', seed=7, chunk_size=n_records).to_bytes()
+    for chunk_size in (1000, BLOCK_SIZE + 1):
+        assert FeedGenerator(n_records, 'jumpy', seed=7, chunk_size=chunk_size).to_bytes() == whole
+
+
+def test_chunks_have_chunk_size_records():
+    chunks = list(FeedGenerator(5000, seed=1, chunk_size=1000).iter_chunks())
+    assert [len(book) for book, _ in chunks] == [1000] * 5
+    for book, trades in chunks:
+        assert set(trades["Seq Id"]) <= set(book["Seq Id"])
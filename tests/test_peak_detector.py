@@ -0,0 +1,24 @@
+import numpy as np
+from peak_detector import detect_peaks, iter_chunks
+
+
+def long_excursion():
+    # Noise with one excursion that stays above the threshold for about 3000 samples
+    values = np.random.default_rng(0).normal(0, 0.1, 5000)
+    values[1000:1200] += np.linspace(0, 10, 200)
+    values[1200:4200] += 10 - np.linspace(0, 4, 3000)
+    values[4200:4300] += np.linspace(6, 0, 100)
+    return values
+
+
+def test_boundaries_of_excursion_longer_than_window():
+    values = long_excursion()
+    params = dict(lookahead=200, threshold_halflife=500)
+    expected = detect_peaks([values], window=len(values), **params)
+    found = detect_peaks(iter_chunks(values, 1000), window=500, **params)
+    np.testing.assert_array_equal(found[0], expected[0])
+    for found_column, expected_column in zip(found[2], expected[2]):
+        np.testing.assert_allclose(found_column, expected_column)
+    widths, _, left_ips, right_ips = found[2]
+    assert 1000 < left_ips[-1] < 1010 and 4200 < right_ips[-1] < 4300
+    assert widths[-1] > 3000
@@ -0,0 +1,36 @@
+import os
+import pytest
+from feed_generator import FeedGenerator
+from main import Pipeline, Stage, main
+
+
+def write_feeds(directory, seed):
+    os.makedirs(directory, exist_ok=True)
+    order_book, public_trade = FeedGenerator(2000, seed=seed).to_bytes()
+    with open(os.path.join(directory, 'order_book.feed'), 'wb') as file:
+        file.write(order_book)
+    with open(os.path.join(directory, 'public_trade.feed'), 'wb') as file:
+        file.write(public_trade)
+
+
+def test_same_named_feeds_in_different_directories(tmp_path):
+    for day, seed in (('day1', 1), ('day2', 2)):
+        write_feeds(tmp_path / 'd' / 'ABC' / day, seed)
+    work_dir = tmp_path / 'pw'
+    assert main([str(tmp_path / 'd'), '-w', str(work_dir), '-j', '1', '--format', 'parquet', '-d', '0.1']) == 0
+    for day in ('day1', 'day2'):
+        out = work_dir / 'ABC' / day
+        assert (out / 'order_book' / 'order_book.h5').exists()
+        assert (out / 'order_book' / 'events_100ms.parquet').exists()
+        assert (out / 'public_trade' / 'public_trade.h5').exists()
+    assert (work_dir / 'ABC' / 'day1' / 'order_book' / 'order_book.h5').read_bytes() != \
+        (work_dir / 'ABC' / 'day2' / 'order_book' / 'order_book.h5').read_bytes()
+
+
+def test_add_rejects_duplicate_stage_names_and_outputs(tmp_path):
+    pipeline = Pipeline(str(tmp_path))
+    pipeline.add(Stage('a/convert', print, ['a.feed'], [str(tmp_path / 'a.h5')]))
+    with pytest.raises(ValueError):
+        pipeline.add(Stage('a/convert', print, ['b.feed'], [str(tmp_path / 'b.h5')]))
+    with pytest.raises(ValueError):
+        pipeline.add(Stage('b/convert', print, ['b.feed'], [str(tmp_path / 'a.h5')]))
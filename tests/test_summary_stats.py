@@ -0,0 +1,11 @@
+import numpy as np
+from summary_stats import Moments, Histogram, QuantileSketch
+
+
+def test_summaries_count_the_same_values():
+    values = [-np.inf, -10.0, -1.0, 0.0, 0.5, 1.0, 10.0, np.inf, np.nan]
+    moments = Moments().update(values)
+    histogram = Histogram(np.linspace(-5, 5, 11)).update(values)
+    sketch = QuantileSketch().update(values)
+    assert moments.count == histogram.counts.sum() == sketch.count == 6
+    assert histogram.underflow == 1 and histogram.overflow == 1
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from trade_joiner import TradeJoiner
+
+
+def book_and_trades(seed=6):
+    rng = np.random.default_rng(seed)
+    book_times = np.sort(rng.uniform(0, 10, 3000))
+    mid = 100 + np.cumsum(rng.normal(0, 0.02, len(book_times)))
+    order_book = pd.DataFrame({"Transaction time": book_times, "Bid price": mid - 0.05, "Ask price": mid + 0.05})
+    # Trades out of time order, some before the first quote and some on quote times
+    trade_times = np.concatenate((rng.uniform(-0.5, 10.5, 800), book_times[::100]))
+    public_trade = pd.DataFrame({
+        "Transaction time": trade_times,
+        "Trade price": np.round(np.interp(trade_times, book_times, mid) + rng.normal(0, 0.05, len(trade_times)), 2),
+        "Trade qty": rng.integers(1, 50, len(trade_times)).astype(float),
+    })
+    return order_book, public_trade
+
+
+def test_prevailing_quotes_match_merge_asof():
+    order_book, public_trade = book_and_trades()
+    quotes = TradeJoiner(order_book, public_trade).prevailing_quotes()
+    expected = pd.merge_asof(public_trade.sort_values("Transaction time", kind="stable"),
+                             order_book.reset_index().rename(columns={"index": "Order book row"}),
+                             on="Transaction time", direction="backward")
+    np.testing.assert_array_equal(quotes["Transaction time"], expected["Transaction time"])
+    np.testing.assert_array_equal(quotes["Order book row"], expected["Order book row"].fillna(-1))
+    np.testing.assert_array_equal(quotes["Bid price"], expected["Bid price"])
+    np.testing.assert_array_equal(quotes["Ask price"], expected["Ask price"])
+
+
+def test_features_match_groupby_and_windows():
+    order_book, public_trade = book_and_trades()
+    joiner = TradeJoiner(order_book, public_trade)
+    quotes = joiner.prevailing_quotes()
+    mid = (quotes["Bid price"] + quotes["Ask price"]) / 2
+    quotes["Signed qty"] = np.sign(quotes["Trade price"] - mid).fillna(0) * quotes["Trade qty"]
+    quotes["Notional"] = quotes["Trade price"] * quotes["Trade qty"]
+    bucket_size = 0.5
+    bins = ((quotes["Transaction time"] - order_book["Transaction time"].iloc[0]) / bucket_size).astype(int)
+    grouped = quotes.groupby(bins).agg(volume=("Trade qty", "sum"), count=("Trade qty", "size"),
+                                       notional=("Notional", "sum"), signed=("Signed qty", "sum"))
+    features = joiner.bin_features(bucket_size)
+    np.testing.assert_allclose(features.index, grouped.index * bucket_size)
+    np.testing.assert_allclose(features["Trade volume"], grouped["volume"])
+    np.testing.assert_array_equal(features["Trade count"], grouped["count"])
+    np.testing.assert_allclose(features["VWAP"], grouped["notional"] / grouped["volume"])
+    np.testing.assert_allclose(features["Signed flow"], grouped["signed"])
+    starts = np.array([-1.0, 0.0, 2.5, 9.9, 4.0])
+    ends = np.array([0.0, 1.0, 2.5, 11.0, 3.0])
+    windows = joiner.window_features(starts, ends)
+    for row, (start, end) in enumerate(zip(starts, ends)):
+        inside = quotes[(quotes["Transaction time"] >= start) & (quotes["Transaction time"] < end)]
+        assert windows["Trade count"].iloc[row] == len(inside)
+        np.testing.assert_allclose(windows["Trade volume"].iloc[row], inside["Trade qty"].sum())
+        np.testing.assert_allclose(windows["Signed flow"].iloc[row], inside["Signed qty"].sum(), atol=1e-9)
+    assert np.isnan(windows["VWAP"].iloc[2]) and np.isnan(windows["VWAP"].iloc[4])